@@ -32,15 +32,41 @@ module kb_functional_enrichment_1 {
         boolean ignore_go_term_not_in_feature_set;
     } FEOneInput;
 
+    /*
+        stage: run stage, one of feature_set_load, genome_load, ontology_load, propagation,
+               statistics, fdr, file_writing, html, shock_upload, report_creation
+        started_at: seconds from the start of the run
+        wall_time: seconds spent in the stage
+        cpu_time: CPU seconds spent in the stage
+        rss: resident memory of the process in bytes at the end of the stage
+        peak_rss: highest resident memory of the process in bytes so far, at the end of the
+                  stage; in a long lived process it may have been reached by an earlier run
+        bytes_sent: bytes sent to KBase services during the stage
+        bytes_received: bytes received from KBase services during the stage
+    */
+    typedef structure{
+        string stage;
+        float started_at;
+        float wall_time;
+        float cpu_time;
+        int rss;
+        int peak_rss;
+        int bytes_sent;
+        int bytes_received;
+    } StageTiming;
+
     /*
         result_directory: folder path that holds all files generated by run_deseq2_app
         report_name: report name generated by KBaseReport
         report_ref: report reference generated by KBaseReport
+        stage_timings: per stage resource usage, also written to stage_timings.json in
+                       result_directory
     */
     typedef structure{
         string result_directory;
         string report_name;
         string report_ref;
+        list<StageTiming> stage_timings;
     }FEOneResult;
 
     /*  
@@ -48,4 +74,31 @@ module kb_functional_enrichment_1 {
     */
     funcdef run_fe1(FEOneInput params)
         returns (FEOneResult returnVal) authentication required;
+
+    /*
+      required params:
+      feature_set_refs: FeatureSet object references, all FeatureSets must reference the same Genome
+      workspace_name: the name of the workspace it gets saved to
+
+      optional params:
+      propagation: includes is_a relationship to all go terms (default is 1)
+      filter_ref_features: filter reference genome features with no go terms (default is 0)
+      statistical_significance: parameter for statistical significance. Select one from left_tailed, right_tailed or two_tailed (default is left_tailed)
+      ignore_go_term_not_in_feature_set: ignore Go term analysis if term is not associated with FeatureSet (default is 1)
+    */
+    typedef structure{
+        list<obj_ref> feature_set_refs;
+        string workspace_name;
+        boolean propagation;
+        boolean filter_ref_features;
+        string  statistical_significance;
+        boolean ignore_go_term_not_in_feature_set;
+    } FEOneBatchInput;
+
+    /*
+        run_fe1_batch: run functional enrichment one on multiple FeatureSets of one Genome
+                       and generate a single combined report
+    */
+    funcdef run_fe1_batch(FEOneBatchInput params)
+        returns (FEOneResult returnVal) authentication required;
 };
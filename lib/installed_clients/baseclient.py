@@ -7,14 +7,23 @@
 
 from __future__ import print_function
 
+import gzip as _gzip
 import json as _json
 import requests as _requests
 import random as _random
 import os as _os
+import threading as _threading
 import traceback as _traceback
+from requests.adapters import HTTPAdapter as _HTTPAdapter
 from requests.exceptions import ConnectionError
 from urllib3.exceptions import ProtocolError
 
+try:
+    import ijson as _ijson  # optional, enables incremental response decoding
+    from ijson.common import ObjectBuilder as _ObjectBuilder
+except ImportError:
+    _ijson = None
+
 try:
     from configparser import ConfigParser as _ConfigParser  # py 3
 except ImportError:
@@ -31,6 +40,134 @@ _AJ = 'application/json'
 _URL_SCHEME = frozenset(['http', 'https'])
 _CHECK_JOB_RETRYS = 3
 
+# connection pool of the shared session, per host
+_POOL_CONNECTIONS = 10
+_POOL_MAXSIZE = 16
+# methods without side effects, safe to send again when a call fails in transit
+_IDEMPOTENT_METHOD_PREFIXES = ('get_', 'list_', 'search', 'status', 'ver', '_check_job')
+_RETRY_STATUS = frozenset([502, 503, 504])
+
+_session = None
+_session_pid = None
+_session_lock = _threading.Lock()
+# request and response bytes of the calling thread, see transferred_bytes
+_transfer = _threading.local()
+
+
+def configure_session(pool_connections=None, pool_maxsize=None):
+    '''
+    Set the connection pool size of the keep-alive session shared by all
+    clients in this process. The session is recreated on next use.
+    pool_connections - number of hosts to keep connection pools for.
+    pool_maxsize - maximum number of kept-alive connections per host.
+    '''
+    global _POOL_CONNECTIONS, _POOL_MAXSIZE, _session
+    with _session_lock:
+        if pool_connections is not None:
+            _POOL_CONNECTIONS = int(pool_connections)
+        if pool_maxsize is not None:
+            _POOL_MAXSIZE = int(pool_maxsize)
+        _session = None
+
+
+def _get_session():
+    # one session per process, connections must not be shared with forked
+    # children
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != _os.getpid():
+            session = _requests.Session()
+            adapter = _HTTPAdapter(pool_connections=_POOL_CONNECTIONS,
+                                   pool_maxsize=_POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _session_pid = _os.getpid()
+        return _session
+
+
+def transferred_bytes():
+    '''
+    Return (bytes sent, bytes received) over the wire by all clients in the
+    calling thread so far. Received bytes are counted as read from the
+    connection, before gzip decoding.
+    '''
+    return getattr(_transfer, 'sent', 0), getattr(_transfer, 'received', 0)
+
+
+def _count_transfer(sent, received):
+    _transfer.sent = getattr(_transfer, 'sent', 0) + sent
+    _transfer.received = getattr(_transfer, 'received', 0) + received
+
+
+def _is_idempotent(method):
+    return method.split('.')[-1].startswith(_IDEMPOTENT_METHOD_PREFIXES)
+
+
+def _build_value(events, event, value):
+    # complete the JSON value starting with event from the ijson event stream
+    if event not in ('start_map', 'start_array'):
+        return value
+    builder = _ObjectBuilder()
+    builder.event(event, value)
+    depth = 1
+    for _, event, value in events:
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                break
+    return builder.value
+
+
+def _iter_stream_items(events, prefixes):
+    # values at the given ijson prefixes in document order, a prefix ending
+    # with .* yields the (key, value) pairs of the map at that prefix
+    item_prefixes = set(p for p in prefixes if not p.endswith('.*'))
+    kv_prefixes = set(p[:-2] for p in prefixes if p.endswith('.*'))
+    events = iter(events)
+    for current, event, value in events:
+        if event == 'map_key' and current in kv_prefixes:
+            _, item_event, item_value = next(events)
+            yield current + '.*', (value, _build_value(events, item_event,
+                                                       item_value))
+        elif current in item_prefixes and event not in (
+                'map_key', 'end_map', 'end_array'):
+            yield current, _build_value(events, event, value)
+
+
+def _watch_result(events, found):
+    # passes ijson events through, noting in found when the response holds a
+    # result array
+    for current, event, value in events:
+        if current == 'result' and event == 'start_array':
+            found.append(True)
+        yield current, event, value
+
+
+def _iter_decoded_items(obj, prefixes):
+    # same as _iter_stream_items over an already decoded object, grouped by
+    # prefix instead of document order
+    def walk(node, path):
+        if not path:
+            yield node
+        elif path[0] == 'item' and isinstance(node, list):
+            for element in node:
+                for found in walk(element, path[1:]):
+                    yield found
+        elif path[0] == '*' and len(path) == 1 and isinstance(node, dict):
+            for item in node.items():
+                yield item
+        elif isinstance(node, dict) and path[0] in node:
+            for found in walk(node[path[0]], path[1:]):
+                yield found
+
+    for prefix in prefixes:
+        for found in walk(obj, prefix.split('.')):
+            yield prefix, found
+
 
 def _get_token(user_id, password, auth_svc):
     # This is bandaid helper function until we get a full
@@ -120,6 +257,14 @@ class BaseClient(object):
     lookup_url - set to true when contacting KBase dynamic services.
     async_job_check_time_ms - the wait time between checking job state for
         asynchronous jobs run with the run_job method.
+    max_retries - number of times idempotent (get_*, list_*, search*, status,
+        ver) calls are resent after a connection error or a 502, 503 or 504
+        response.
+    retry_backoff_s - wait before the first resend, doubled for every further
+        resend.
+    gzip_request_min_bytes - gzip request bodies of at least this size. Only
+        for servers that accept Content-Encoding: gzip requests, default None
+        sends plain bodies. Responses are always accepted gzipped.
     '''
     def __init__(
             self, url=None, timeout=30 * 60, user_id=None,
@@ -129,7 +274,10 @@ class BaseClient(object):
             lookup_url=False,
             async_job_check_time_ms=100,
             async_job_check_time_scale_percent=150,
-            async_job_check_max_time_ms=300000):
+            async_job_check_max_time_ms=300000,
+            max_retries=3,
+            retry_backoff_s=0.5,
+            gzip_request_min_bytes=None):
         if url is None:
             raise ValueError('A url is required')
         scheme, _, _, _, _, _ = _urlparse(url)
@@ -144,6 +292,9 @@ class BaseClient(object):
         self.async_job_check_time_scale_percent = (
             async_job_check_time_scale_percent)
         self.async_job_check_max_time = async_job_check_max_time_ms / 1000.0
+        self.max_retries = int(max_retries)
+        self.retry_backoff = retry_backoff_s
+        self.gzip_request_min_bytes = gzip_request_min_bytes
         # token overrides user_id and password
         if token is not None:
             self._headers['AUTHORIZATION'] = token
@@ -164,7 +315,7 @@ class BaseClient(object):
         if self.timeout < 1:
             raise ValueError('Timeout value must be at least 1 second')
 
-    def _call(self, url, method, params, context=None):
+    def _post(self, url, method, params, context=None, stream=False):
         arg_hash = {'method': method,
                     'params': params,
                     'version': '1.1',
@@ -175,10 +326,30 @@ class BaseClient(object):
                 raise ValueError('context is not type dict as required.')
             arg_hash['context'] = context
 
-        body = _json.dumps(arg_hash, cls=_JSONObjectEncoder)
-        ret = _requests.post(url, data=body, headers=self._headers,
-                             timeout=self.timeout,
-                             verify=not self.trust_all_ssl_certificates)
+        body = _json.dumps(arg_hash, cls=_JSONObjectEncoder).encode('utf-8')
+        headers = self._headers
+        if (self.gzip_request_min_bytes is not None and
+                len(body) >= self.gzip_request_min_bytes):
+            body = _gzip.compress(body)
+            headers = dict(self._headers, **{'Content-Encoding': 'gzip'})
+
+        retries = self.max_retries if _is_idempotent(method) else 0
+        for attempt in range(retries + 1):
+            _count_transfer(len(body), 0)
+            try:
+                ret = _get_session().post(
+                    url, data=body, headers=headers, timeout=self.timeout,
+                    verify=not self.trust_all_ssl_certificates, stream=stream)
+            except ConnectionError:
+                if attempt == retries:
+                    raise
+            else:
+                if not stream:
+                    _count_transfer(0, ret.raw.tell())
+                if ret.status_code not in _RETRY_STATUS or attempt == retries:
+                    break
+                ret.close()
+            time.sleep(self.retry_backoff * 2 ** attempt)
         ret.encoding = 'utf-8'
         if ret.status_code == 500:
             if ret.headers.get(_CT) == _AJ:
@@ -191,6 +362,10 @@ class BaseClient(object):
                 raise ServerError('Unknown', 0, ret.text)
         if not ret.ok:
             ret.raise_for_status()
+        return ret
+
+    def _call(self, url, method, params, context=None):
+        ret = self._post(url, method, params, context)
         resp = ret.json()
         if 'result' not in resp:
             raise ServerError('Unknown', 0, 'An unknown server error occurred')
@@ -200,6 +375,32 @@ class BaseClient(object):
             return resp['result'][0]
         return resp['result']
 
+    def _call_stream(self, url, method, params, prefixes, context=None):
+        ret = self._post(url, method, params, context, stream=True)
+        try:
+            if _ijson is None:
+                resp = ret.json()
+                if 'result' not in resp:
+                    raise ServerError('Unknown', 0,
+                                      'An unknown server error occurred')
+                items = _iter_decoded_items(resp['result'][0], prefixes)
+            else:
+                ret.raw.decode_content = True
+                found = []
+                events = _watch_result(_ijson.parse(ret.raw, use_float=True),
+                                       found)
+                items = ((prefix[len('result.item.'):], value)
+                         for prefix, value in _iter_stream_items(
+                             events, ['result.item.' + p for p in prefixes]))
+            for item in items:
+                yield item
+            if _ijson is not None and not found:
+                raise ServerError('Unknown', 0,
+                                  'An unknown server error occurred')
+        finally:
+            _count_transfer(0, ret.raw.tell())
+            ret.close()
+
     def _get_service_url(self, service_method, service_version):
         if not self.lookup_url:
             return self.url
@@ -265,6 +466,32 @@ class BaseClient(object):
         raise RuntimeError("_check_job failed {} times and exceeded limit".format(
             check_job_failures))
 
+    def call_method_stream(self, service_method, args, prefixes,
+                           service_ver=None, context=None):
+        '''
+        Call a standard or dynamic service synchronously and yield only the
+        parts of its (first) return value found at the given prefixes, as
+        (prefix, value) pairs. With ijson installed the response is decoded
+        incrementally, so the full response never has to be held in memory;
+        without it the response is decoded as a whole.
+        Required arguments:
+        service_method - the service and method to run, e.g. myserv.mymeth.
+        args - a list of arguments to the method.
+        prefixes - ijson style prefixes relative to the return value, e.g.
+            data.item.data.features.item for every feature of every object
+            returned by Workspace.get_objects2. A prefix ending with .* yields
+            the (key, value) pairs of the map at that prefix. Values of
+            different prefixes come in document order with ijson and grouped
+            by prefix without it.
+        Optional arguments:
+        service_ver - the version of the service to run, e.g. a git hash
+            or dev/beta/release.
+        context - the rpc context dict.
+        '''
+        url = self._get_service_url(service_method, service_ver)
+        context = self._set_up_context(service_ver, context)
+        return self._call_stream(url, service_method, args, prefixes, context)
+
     def call_method(self, service_method, args, service_ver=None,
                     context=None):
         '''
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import pickle
+import uuid
+
+from kb_functional_enrichment_1.Utils.Common import log, mkdir_p
+
+
+CACHE_FILE_SUFFIX = '.pickle'
+
+
+class DiskCache:
+    """
+    DiskCache: content addressed cache of pickled objects in a directory
+
+    Entries are named after the sha256 of their key. Reading an entry refreshes its
+    modification time, and the least recently used entries are removed once the total
+    size of the cache exceeds max_bytes.
+    """
+
+    def _entry_path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + CACHE_FILE_SUFFIX)
+
+    def _entries(self):
+        """
+        _entries: (modification time, size, path) of all cache entries
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(CACHE_FILE_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+
+    def get(self, key):
+        """
+        get: cached object for key, None on cache miss
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                value = pickle.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            log('ignoring unreadable cache file {}: {}'.format(path, e))
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return value
+
+    def put(self, key, value):
+        """
+        put: store object for key and evict least recently used entries over max_bytes
+        """
+        mkdir_p(self.cache_dir)
+        path = self._entry_path(key)
+        tmp_path = '{}.{}.tmp'.format(path, uuid.uuid4())
+        with open(tmp_path, 'wb') as cache_file:
+            pickle.dump(value, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """
+        evict: remove least recently used entries until the cache fits in max_bytes
+        """
+        entries = sorted(self._entries())
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total_bytes -= size
+                log('evicted cache file {}'.format(path))
+            except OSError:
+                pass
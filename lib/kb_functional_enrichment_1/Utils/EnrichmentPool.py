@@ -0,0 +1,126 @@
+import multiprocessing
+import threading
+
+import numpy as np
+
+from kb_functional_enrichment_1.Utils.FisherExact import fisher_exact
+
+# pools running at once in a process; further calls wait for a running pool to finish
+MAX_CONCURRENT_POOLS = 1
+
+# enrichment inputs of the pool worker process, set by the pool initializer
+_worker_state = {}
+
+_pool_slots = threading.BoundedSemaphore(MAX_CONCURRENT_POOLS)
+
+# pool workers are forked from a single threaded fork server started on first use, never
+# from the multi-threaded service process, so they can't inherit a lock held by another
+# thread; the fork server imports numpy and scipy.sparse (to unpickle the term matrix) once
+_context = multiprocessing.get_context('forkserver')
+_context.set_forkserver_preload([__name__, 'scipy.sparse'])
+
+
+def enrichment_statistics(term_matrix, feature_set_masks, reference_mask,
+                          statistical_significance, ignore_go_term_not_in_feature_set):
+    """
+    enrichment_statistics: Fisher's exact test of every GO term against every FeatureSet
+
+    term_matrix: boolean scipy.sparse.csc_matrix of shape (features, terms)
+    feature_set_masks: boolean array of shape (features, FeatureSets)
+    reference_mask: boolean array of reference features
+
+    return:
+    list of (terms, num_in_feature_set, raw_p_values), one per FeatureSet;
+    terms are the tested term indexes
+    """
+    # FeatureSet features outside the reference features (features with no term when
+    # filter_ref_features is set) are not part of the contingency table
+    feature_set_masks = feature_set_masks & reference_mask[:, np.newaxis]
+    feature_set_sizes = feature_set_masks.sum(axis=0)
+    reference_size = int(reference_mask.sum())
+
+    # (terms, FeatureSets) counts of FeatureSet features matching go_id
+    a_matrix = term_matrix.T.dot(feature_set_masks.astype(np.int64))
+    num_in_ref_genome = np.diff(term_matrix.indptr)
+
+    selected_terms = []
+    tables = []
+    for feature_set, feature_set_size in enumerate(feature_set_sizes.tolist()):
+        a_values = a_matrix[:, feature_set]
+        # ignore go term analysis if not associated with FeatureSet
+        if ignore_go_term_not_in_feature_set:
+            terms = np.flatnonzero(a_values)
+        else:
+            terms = np.arange(term_matrix.shape[1])
+        a_values = a_values[terms]
+
+        # in feature_set doesn't match go_id
+        b_values = feature_set_size - a_values
+        # not in feature_set matches go_id
+        c_values = num_in_ref_genome[terms] - a_values
+        # not in feature_set doesn't match go_id
+        d_values = reference_size - feature_set_size - c_values
+
+        selected_terms.append(terms)
+        tables.append((a_values, b_values, c_values, d_values))
+
+    left_tail, right_tail, two_tail = fisher_exact(
+        *[np.concatenate([table[pos] for table in tables]) for pos in range(4)])
+    if statistical_significance == 'left_tailed':
+        raw_p_values = left_tail
+    elif statistical_significance == 'right_tailed':
+        raw_p_values = right_tail
+    else:
+        raw_p_values = two_tail
+
+    statistics = []
+    offset = 0
+    for terms, (a_values, _, _, _) in zip(selected_terms, tables):
+        statistics.append((terms, a_values, raw_p_values[offset:offset + len(terms)]))
+        offset += len(terms)
+
+    return statistics
+
+
+def _init_worker(term_matrix, feature_set_masks, reference_mask, statistical_significance,
+                 ignore_go_term_not_in_feature_set):
+    _worker_state.update({'term_matrix': term_matrix,
+                          'feature_set_masks': feature_set_masks,
+                          'reference_mask': reference_mask,
+                          'statistical_significance': statistical_significance,
+                          'ignore_go_term_not_in_feature_set': ignore_go_term_not_in_feature_set})
+
+
+def _enrichment_statistics_worker(feature_sets):
+    return enrichment_statistics(_worker_state['term_matrix'],
+                                 _worker_state['feature_set_masks'][:, feature_sets],
+                                 _worker_state['reference_mask'],
+                                 _worker_state['statistical_significance'],
+                                 _worker_state['ignore_go_term_not_in_feature_set'])
+
+
+def parallel_enrichment_statistics(worker_count, term_matrix, feature_set_masks, reference_mask,
+                                   statistical_significance, ignore_go_term_not_in_feature_set):
+    """
+    parallel_enrichment_statistics: enrichment_statistics with FeatureSets split across a
+                                    pool of worker_count processes
+
+    falls back to computing in process for a single worker or FeatureSet; at most
+    MAX_CONCURRENT_POOLS pools run at once in a process
+    """
+    feature_set_count = feature_set_masks.shape[1]
+    worker_count = min(worker_count, feature_set_count)
+    if worker_count <= 1:
+        return enrichment_statistics(term_matrix, feature_set_masks, reference_mask,
+                                     statistical_significance,
+                                     ignore_go_term_not_in_feature_set)
+
+    # every pool gets its own inputs as initializer arguments, sent to every worker once
+    initargs = (term_matrix, feature_set_masks, reference_mask, statistical_significance,
+                ignore_go_term_not_in_feature_set)
+    with _pool_slots:
+        with _context.Pool(worker_count, initializer=_init_worker, initargs=initargs) as pool:
+            chunks = pool.map(_enrichment_statistics_worker,
+                              np.array_split(np.arange(feature_set_count), worker_count))
+
+    return [statistics for chunk in chunks for statistics in chunk]
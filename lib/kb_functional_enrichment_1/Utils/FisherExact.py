@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+
+# relative tolerance used to collect tables as extreme as the observed one in the two-tailed test
+TWO_TAIL_TOLERANCE = 1e-7
+
+_log_factorial_table = np.zeros(1)
+
+
+def _log_factorials(max_n):
+    """
+    _log_factorials: table of log(i!) for i in 0..max_n, grown and cached across calls
+    """
+    global _log_factorial_table
+
+    if len(_log_factorial_table) <= max_n:
+        size = max(max_n + 1, 2 * len(_log_factorial_table))
+        _log_factorial_table = np.fromiter(map(math.lgamma, range(1, size + 1)),
+                                           dtype=np.float64, count=size)
+
+    return _log_factorial_table
+
+
+def fisher_exact(a, b, c, d):
+    """
+    fisher_exact: Fisher's exact test for a batch of 2x2 contingency tables [[a, b], [c, d]]
+
+    all tables are evaluated in log space with a shared log-factorial table; tables with the
+    same margins share one hypergeometric distribution
+
+    return:
+    left_tail: P(X <= a) for every table
+    right_tail: P(X >= a) for every table
+    two_tail: sum of P(X = x) over x no more likely than a for every table
+    """
+    a, b, c, d = [np.asarray(value, dtype=np.int64).ravel() for value in (a, b, c, d)]
+    if not len(a) == len(b) == len(c) == len(d):
+        raise ValueError('contingency table values must have the same length')
+    if len(a) and min(a.min(), b.min(), c.min(), d.min()) < 0:
+        raise ValueError('contingency table values must be non-negative')
+
+    left_tail = np.ones(len(a))
+    right_tail = np.ones(len(a))
+    two_tail = np.ones(len(a))
+    if not len(a):
+        return left_tail, right_tail, two_tail
+
+    row_total = a + b
+    col_total = a + c
+    total = a + b + c + d
+    lf = _log_factorials(int(total.max()))
+
+    margins, margin_groups = np.unique(np.stack([total, row_total, col_total], axis=1),
+                                       axis=0, return_inverse=True)
+    margin_groups = margin_groups.ravel()
+    order = np.argsort(margin_groups, kind='stable')
+    group_bounds = np.searchsorted(margin_groups[order], np.arange(len(margins) + 1))
+
+    for group, (n, r, k) in enumerate(margins.tolist()):
+        positions = order[group_bounds[group]:group_bounds[group + 1]]
+
+        low = max(0, r + k - n)
+        high = min(r, k)
+        x = np.arange(low, high + 1)
+        log_pmf = (lf[k] - lf[x] - lf[k - x] + lf[n - k] - lf[r - x] - lf[n - k - r + x] -
+                   (lf[n] - lf[r] - lf[n - r]))
+        pmf = np.exp(log_pmf)
+
+        observed = a[positions] - low
+        left_tail[positions] = np.cumsum(pmf)[observed]
+        right_tail[positions] = np.cumsum(pmf[::-1])[::-1][observed]
+
+        sorted_pmf = np.sort(pmf)
+        sorted_cumsum = np.cumsum(sorted_pmf)
+        extreme_count = np.searchsorted(sorted_pmf, pmf[observed] * (1 + TWO_TAIL_TOLERANCE),
+                                        side='right')
+        two_tail[positions] = sorted_cumsum[extreme_count - 1]
+
+    return (np.minimum(left_tail, 1.0), np.minimum(right_tail, 1.0),
+            np.minimum(two_tail, 1.0))
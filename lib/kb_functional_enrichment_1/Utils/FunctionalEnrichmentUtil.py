@@ -2,19 +2,57 @@ import csv
 import errno
 import json
 import os
-import re
 import time
 import uuid
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
-import fisher
-from rpy2.robjects.packages import importr
-from rpy2.robjects.vectors import FloatVector
+import numpy as np
 
 from installed_clients.DataFileUtilClient import DataFileUtil
 from installed_clients.GenomeSearchUtilClient import GenomeSearchUtil
 from installed_clients.KBaseReportClient import KBaseReport
 from installed_clients.WorkspaceClient import Workspace as Workspace
+from installed_clients.baseclient import BaseClient
+from kb_functional_enrichment_1.Utils.DiskCache import DiskCache
+from kb_functional_enrichment_1.Utils.EnrichmentPool import parallel_enrichment_statistics
+from kb_functional_enrichment_1.Utils.GenomeAnnotation import GenomeAnnotationBuilder
+from kb_functional_enrichment_1.Utils.MultipleTesting import p_adjust
+from kb_functional_enrichment_1.Utils.OntologyCache import OntologyCache
+from kb_functional_enrichment_1.Utils.SingleFlight import SingleFlight
+from kb_functional_enrichment_1.Utils.StageTimer import StageTimer
+
+# number of genome features requested per GenomeSearchUtil.search call
+GENOME_PAGE_SIZE = 5000
+
+# genome feature arrays and the feature fields the GO annotation is built from
+GENOME_FEATURE_ARRAYS = ['features', 'cdss', 'mrnas', 'non_coding_features']
+GENOME_FEATURE_FIELDS = ['id', 'ontology_terms']
+
+# threads used to fetch the FeatureSets, genome and ontology concurrently
+FETCH_THREAD_COUNT = 8
+
+# enrichment table columns of the html report
+ENRICHMENT_TABLE_COLUMNS = ['Term ID', 'Description', 'Ontology', 'Number in FeatureSet',
+                            'Number in Genome', 'Raw p-value', 'Corrected p-value']
+ENRICHMENT_CSV_HEADER = ['term_id', 'term', 'ontology', 'num_in_feature_set',
+                         'num_in_ref_genome', 'raw_p_value', 'adjusted_p_value']
+
+# bump when the cached GenomeAnnotation layout changes to invalidate existing cache entries
+GENOME_ANNOTATION_CACHE_VERSION = 2
+# default total size of the genome annotation cache under scratch
+ANNOTATION_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# bump when run_fe1 output files change to invalidate cached results
+RESULT_CACHE_VERSION = 1
+# default total size of the run_fe1 result cache under scratch, 0 disables the cache
+RESULT_CACHE_MAX_BYTES = 1024 ** 3
+# seconds a run waits for the first load of the resident ontology before loading the
+# ontology itself
+RESIDENT_ONTOLOGY_TIMEOUT = 60
+
+# genome annotation loads in flight in this process, shared by concurrent runs
+_annotation_flights = SingleFlight()
 
 
 def log(message, prefix_newline=False):
@@ -51,26 +89,95 @@ class FunctionalEnrichmentUtil:
             if p not in params:
                 raise ValueError('"{}" parameter is required, but missing'.format(p))
 
+    def _validate_run_fe1_batch_params(self, params):
+        """
+        _validate_run_fe1_batch_params:
+                validates params passed to run_fe1_batch method
+        """
+
+        log('start validating run_fe1_batch params')
+
+        # check for required parameters
+        for p in ['feature_set_refs', 'workspace_name']:
+            if p not in params:
+                raise ValueError('"{}" parameter is required, but missing'.format(p))
+
+        feature_set_refs = params['feature_set_refs']
+        if not isinstance(feature_set_refs, list) or not feature_set_refs:
+            raise ValueError('"feature_set_refs" must be a non-empty list of FeatureSet references')
+
+        if len(set(feature_set_refs)) != len(feature_set_refs):
+            raise ValueError('"feature_set_refs" contains duplicate FeatureSet references')
+
     def _generate_report(self, enrichment_map, result_directory, workspace_name,
-                         feature_id_go_id_list_map, feature_set_ids, genome_ref,
-                         go_id_parent_ids_map, feature_ids):
+                         annotation, feature_set_ids, genome_ref,
+                         go_id_parent_ids_map, reference_mask):
         """
         _generate_report: generate summary report
+
+        return:
+        report_output: report name and reference
+        output_files: file_links of the report
+        html_directory: directory holding the html report
         """
 
         log('start creating report')
 
-        output_files = self._generate_output_file_list(result_directory,
-                                                       enrichment_map,
-                                                       feature_id_go_id_list_map,
-                                                       feature_set_ids,
-                                                       genome_ref,
-                                                       go_id_parent_ids_map,
-                                                       feature_ids)
+        with self.timer.stage('file_writing'):
+            output_files = self._generate_output_file_list(result_directory,
+                                                           enrichment_map,
+                                                           annotation,
+                                                           feature_set_ids,
+                                                           genome_ref,
+                                                           go_id_parent_ids_map,
+                                                           reference_mask)
+
+        html_directory = self._generate_html_report(result_directory, enrichment_map)
+        output_html_files = self._upload_html_report(html_directory)
+
+        report_output = self._create_report(workspace_name, output_files, output_html_files)
+
+        return report_output, output_files, html_directory
+
+    def _generate_batch_report(self, enrichment_maps, feature_set_refs, result_directory,
+                               workspace_name):
+        """
+        _generate_batch_report: generate one summary report for all FeatureSets
+        """
+
+        log('start creating batch report')
+
+        result_file = os.path.join(result_directory, 'functional_enrichment.csv')
+        with self.timer.stage('file_writing'), open(result_file, 'w') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['feature_set_ref'] + ENRICHMENT_CSV_HEADER)
+            for feature_set_ref, enrichment_map in zip(feature_set_refs, enrichment_maps):
+                for key, value in enrichment_map.items():
+                    writer.writerow([feature_set_ref] + self._enrichment_csv_row(key, value))
+
+        output_files = [{'path': result_file,
+                         'name': os.path.basename(result_file),
+                         'label': os.path.basename(result_file),
+                         'description': 'GO term functional enrichment of all FeatureSets'}]
 
-        output_html_files = self._generate_html_report(result_directory,
-                                                       enrichment_map)
+        log('start generating html report')
+        enrichment_table = ''
+        with self.timer.stage('html'):
+            for feature_set_ref, enrichment_map in zip(feature_set_refs, enrichment_maps):
+                for go_id, go_info in self._sort_enrichment_map(enrichment_map):
+                    enrichment_table += self._enrichment_table_row(go_id, go_info,
+                                                                   [feature_set_ref])
 
+        html_directory = self._write_html_report(['FeatureSet'] + ENRICHMENT_TABLE_COLUMNS,
+                                                 enrichment_table)
+        output_html_files = self._upload_html_report(html_directory)
+
+        return self._create_report(workspace_name, output_files, output_html_files)
+
+    def _create_report(self, workspace_name, output_files, output_html_files):
+        """
+        _create_report: save KBaseReport with given file and html links
+        """
         report_object_name = 'kb_functional_enrichment_1_report_' + str(uuid.uuid4())
         report_params = {'message': '',
                          'workspace_name': workspace_name,
@@ -80,16 +187,16 @@ class FunctionalEnrichmentUtil:
                          'html_window_height': 333,
                          'report_object_name': report_object_name}
 
-        kbase_report_client = KBaseReport(self.callback_url)
-        output = kbase_report_client.create_extended_report(report_params)
+        with self.timer.stage('report_creation'):
+            output = self.kbase_report.create_extended_report(report_params)
 
         report_output = {'report_name': output['name'], 'report_ref': output['ref']}
 
         return report_output
 
     def _generate_supporting_files(self, result_directory, enrichment_map,
-                                   feature_id_go_id_list_map, feature_set_ids, genome_ref,
-                                   go_id_parent_ids_map, feature_ids):
+                                   annotation, feature_set_ids, genome_ref,
+                                   go_id_parent_ids_map, reference_mask):
         """
         _generate_supporting_files: generate varies debug files
         """
@@ -115,11 +222,8 @@ class FunctionalEnrichmentUtil:
         supporting_files.append(go_id_parent_ids_map_file)
         supporting_files.append(go_id_set_feature_ids_map_file)
 
-        total_feature_ids = list(feature_id_go_id_list_map.keys())
-        feature_ids_with_feature = []
-        for feature_id, go_ids in feature_id_go_id_list_map.items():
-            if isinstance(go_ids, list):
-                feature_ids_with_feature.append(feature_id)
+        annotated_features = annotation.annotated_features()
+        feature_set_id_set = set(feature_set_ids)
         genome_name = self.ws.get_object_info3({'objects':
                                                 [{'ref': genome_ref}]})['infos'][0][1]
 
@@ -129,38 +233,41 @@ class FunctionalEnrichmentUtil:
 
         with open(genome_info_file, 'w') as genome_info_file:
             genome_info_file.write(f'genome_name: {genome_name}\n')
-            genome_info_file.write(f'features: {len(total_feature_ids)}\n')
-            genome_info_file.write(f'features with term: {len(feature_ids_with_feature)}')
+            genome_info_file.write(f'features: {annotation.feature_count}\n')
+            genome_info_file.write(f'features with term: {int(annotated_features.sum())}')
 
         with open(feature_set_ids_file, 'w') as feature_set_ids_file:
             feature_set_ids_file.write('\n'.join(feature_set_ids))
 
         with open(feature_id_go_ids_map_file, 'w') as feature_id_go_ids_map_file:
             with open(feature_ids_file, 'w') as feature_ids_file:
-                for feature_id, go_ids in feature_id_go_id_list_map.items():
-                    feature_ids_file.write(f'{feature_id} {feature_id in feature_set_ids}\n')
-                    if isinstance(go_ids, str):
-                        feature_id_go_ids_map_file.write(f'{feature_id} {go_ids}\n')
-                    else:
+                for feature, feature_id in enumerate(annotation.feature_ids):
+                    feature_ids_file.write(f'{feature_id} {feature_id in feature_set_id_set}\n')
+                    if annotated_features[feature]:
+                        go_ids = annotation.feature_terms(feature)
                         feature_id_go_ids_map_file.write(f'{feature_id} {", ".join(go_ids)}\n')
+                    else:
+                        feature_id_go_ids_map_file.write(f'{feature_id} Unlabeled\n')
 
+        feature_set_size = int((annotation.feature_mask(feature_set_ids) & reference_mask).sum())
+        reference_size = int(reference_mask.sum())
         with open(go_id_genome_feature_ids_map_file, 'w') as go_id_genome_feature_ids_map_file:
             with open(go_id_set_feature_ids_map_file, 'w') as go_id_set_feature_ids_map_file:
                 with open(fisher_variables_file, 'w') as fisher_variables_file:
                     for go_id, go_info in enrichment_map.items():
                         mapped_features = go_info.get('mapped_features')
-                        fs_mapped_features = list(set(mapped_features).intersection(
-                          feature_set_ids))
+                        fs_mapped_features = [feature_id for feature_id in mapped_features
+                                              if feature_id in feature_set_id_set]
                         mapped_features_line = f'{go_id}: {", ".join(mapped_features)}\n'
                         go_id_genome_feature_ids_map_file.write(mapped_features_line)
 
                         set_mapped_features_line = f'{go_id}: {", ".join(fs_mapped_features)}\n'
                         go_id_set_feature_ids_map_file.write(set_mapped_features_line)
                         a_value = go_info.get('num_in_subset_feature_set')
-                        b_value = len(feature_set_ids) - a_value
+                        b_value = feature_set_size - a_value
                         c_value = len(mapped_features) - a_value
-                        d_value = len(feature_ids) - len(feature_set_ids) - c_value
-                        p_value = go_info.get('raw_p_value')
+                        d_value = reference_size - feature_set_size - c_value
+                        p_value = self._round(go_info.get('raw_p_value'))
                         fisher_variables_file.write(
                             f'{go_id} a:{a_value} b:{b_value} c:{c_value} d:{d_value} ')
                         fisher_variables_file.write(f'p_value:{p_value}\n')
@@ -177,8 +284,8 @@ class FunctionalEnrichmentUtil:
                  'description': 'GO term functional enrichment supporting files'}]
 
     def _generate_output_file_list(self, result_directory, enrichment_map,
-                                   feature_id_go_id_list_map, feature_set_ids, genome_ref,
-                                   go_id_parent_ids_map, feature_ids):
+                                   annotation, feature_set_ids, genome_ref,
+                                   go_id_parent_ids_map, reference_mask):
         """
         _generate_output_file_list: zip result files and generate file_links for report
         """
@@ -189,13 +296,9 @@ class FunctionalEnrichmentUtil:
         result_file = os.path.join(result_directory, 'functional_enrichment.csv')
         with open(result_file, 'w') as csv_file:
             writer = csv.writer(csv_file)
-            writer.writerow(['term_id', 'term', 'ontology', 'num_in_feature_set',
-                             'num_in_ref_genome', 'raw_p_value', 'adjusted_p_value'])
+            writer.writerow(ENRICHMENT_CSV_HEADER)
             for key, value in enrichment_map.items():
-                writer.writerow([key, value['go_term'], value['namespace'],
-                                 value['num_in_subset_feature_set'],
-                                 value['num_in_ref_genome'], value['raw_p_value'],
-                                 value['adjusted_p_value']])
+                writer.writerow(self._enrichment_csv_row(key, value))
 
         output_files.append({'path': result_file,
                              'name': os.path.basename(result_file),
@@ -204,111 +307,252 @@ class FunctionalEnrichmentUtil:
 
         supporting_files = self._generate_supporting_files(result_directory,
                                                            enrichment_map,
-                                                           feature_id_go_id_list_map,
+                                                           annotation,
                                                            feature_set_ids,
                                                            genome_ref,
                                                            go_id_parent_ids_map,
-                                                           feature_ids)
+                                                           reference_mask)
         output_files += supporting_files
 
         return output_files
 
-    def _generate_html_report(self, result_directory, enrichment_map):
+    def _enrichment_csv_row(self, go_id, go_info):
+        return [go_id, go_info['go_term'], go_info['namespace'],
+                go_info['num_in_subset_feature_set'], go_info['num_in_ref_genome'],
+                self._round(go_info['raw_p_value']), self._round(go_info['adjusted_p_value'])]
+
+    def _sort_enrichment_map(self, enrichment_map):
         """
-        _generate_html_report: generate html summary report
+        _sort_enrichment_map: enrichment_map items sorted by corrected p-value
         """
+        return sorted(enrichment_map.items(),
+                      key=lambda item: (item[1]['adjusted_p_value'],
+                                        item[1]['raw_p_value'],
+                                        item[1]['num_in_ref_genome']))
+
+    def _enrichment_table_row(self, go_id, go_info, leading_columns=()):
+        row = '<tr>'
+        for column in leading_columns:
+            row += f'<td>{column}</td>'
+        row += f'<td>{go_id}</td>'
+        row += f'<td>{go_info["go_term"]}</td>'
+        row += f'<td>{go_info["namespace"]}</td>'
+        row += f'<td>{go_info["num_in_subset_feature_set"]}</td>'
+        row += f'<td>{go_info["num_in_ref_genome"]}</td>'
+        row += f'<td>{self._round(go_info["raw_p_value"])}</td>'
+        row += f'<td>{self._round(go_info["adjusted_p_value"])}</td></tr>'
+
+        return row
+
+    def _write_html_report(self, columns, enrichment_table):
+        """
+        _write_html_report: fill report template with enrichment table
 
-        log('start generating html report')
-        html_report = list()
-
+        return:
+        directory holding report.html
+        """
         output_directory = os.path.join(self.scratch, str(uuid.uuid4()))
         self._mkdir_p(output_directory)
         result_file_path = os.path.join(output_directory, 'report.html')
 
-        enrichment_table = ''
-        data = csv.DictReader(open(os.path.join(result_directory, 'functional_enrichment.csv')),
-                              delimiter=',')
-        sortedlist = sorted(data, key=lambda row: (float(row['adjusted_p_value']),
-                                                   float(row['raw_p_value']),
-                                                   float(row['num_in_ref_genome'])),
-                            reverse=False)
-
-        for row in sortedlist:
-            # if row['num_in_feature_set'] != '0':
-            enrichment_table += f'<tr><td>{row["term_id"]}</td>'
-            enrichment_table += f'<td>{row["term"]}</td>'
-            enrichment_table += f'<td>{row["ontology"]}</td>'
-            enrichment_table += f'<td>{row["num_in_feature_set"]}</td>'
-            enrichment_table += f'<td>{row["num_in_ref_genome"]}</td>'
-            enrichment_table += f'<td>{float(row["raw_p_value"]):.3g}</td>'
-            enrichment_table += f'<td>{float(row["adjusted_p_value"]):.3g}</td></tr>'
-
-        with open(result_file_path, 'w') as result_file:
+        enrichment_header = '<tr>'
+        for pos, column in enumerate(columns):
+            enrichment_header += f'<th onclick="sortTable({pos})">{column}</th>'
+        enrichment_header += '</tr>'
+
+        with self.timer.stage('html'), open(result_file_path, 'w') as result_file:
             with open(os.path.join(os.path.dirname(__file__), 'report_template.html'),
                       'r') as report_template_file:
                 report_template = report_template_file.read()
+                report_template = report_template.replace('<tr>Enrichment_Header</tr>',
+                                                          enrichment_header)
                 report_template = report_template.replace('<tr>Enrichment_Table</tr>',
                                                           enrichment_table)
                 result_file.write(report_template)
 
-        report_shock_id = self.dfu.file_to_shock({'file_path': output_directory,
-                                                  'pack': 'zip'})['shock_id']
+        return output_directory
+
+    def _upload_html_report(self, html_directory):
+        """
+        _upload_html_report: upload html report directory to shock and generate html_links
+        """
+        html_report = list()
+
+        with self.timer.stage('shock_upload'):
+            report_shock_id = self.dfu.file_to_shock({'file_path': html_directory,
+                                                      'pack': 'zip'})['shock_id']
 
         html_report.append({'shock_id': report_shock_id,
-                            'name': os.path.basename(result_file_path),
-                            'label': os.path.basename(result_file_path),
+                            'name': 'report.html',
+                            'label': 'report.html',
                             'description': 'HTML summary report for Functional Enrichment App'})
         return html_report
 
-    def _get_go_maps_from_genome(self, genome_ref):
+    def _generate_html_report(self, result_directory, enrichment_map):
         """
-        _search_genome: search genome data
+        _generate_html_report: generate html summary report
+
+        return:
+        directory holding report.html
         """
 
-        log('start parsing GO terms from genome')
+        log('start generating html report')
 
-        feature_num = self.gsu.search({'ref': genome_ref})['num_found']
-
-        genome_features = self.gsu.search({'ref': genome_ref,
-                                           'limit': feature_num,
-                                           'sort_by': [['feature_id', True]]})['features']
-
-        feature_id_go_id_list_map = {}
-        go_id_feature_id_list_map = {}
-        go_id_go_term_map = {}
-        feature_id_feature_info_map = {}
-
-        for genome_feature in genome_features:
-            feature_id = genome_feature.get('feature_id')
-            feature_func = genome_feature.get('function')
-            feature_type = genome_feature.get('feature_type')
-            ontology_terms = genome_feature.get('ontology_terms')
-
-            feature_id_feature_info_map.update({feature_id: {'function': feature_func,
-                                                             'feature_type': feature_type}})
-
-            go_id_list = []
-            if ontology_terms:
-                for ontology_id, ontology_term in ontology_terms.items():
-                    if re.match('[gG][oO]\:.*', ontology_id):
-                        go_id_go_term_map.update({ontology_id: ontology_term})
-                        go_id_list.append(ontology_id)
-
-            if go_id_list:
-                feature_id_go_id_list_map.update({feature_id: go_id_list})
-
-                for go_id in go_id_list:
-                    if go_id in go_id_feature_id_list_map:
-                        feature_ids = go_id_feature_id_list_map.get(go_id)
-                        feature_ids.append(feature_id)
-                        go_id_feature_id_list_map.update({go_id: feature_ids})
+        enrichment_table = ''
+        with self.timer.stage('html'):
+            for go_id, go_info in self._sort_enrichment_map(enrichment_map):
+                enrichment_table += self._enrichment_table_row(go_id, go_info)
+
+        return self._write_html_report(ENRICHMENT_TABLE_COLUMNS, enrichment_table)
+
+    def _iter_genome_features(self, genome_ref, structured_query=None):
+        """
+        _iter_genome_features: page through genome features with GenomeSearchUtil.search
+
+        only one page of features (GENOME_PAGE_SIZE) is held in memory at a time
+        structured_query: optional GenomeSearchUtil structured_query restricting features
+        """
+        search_params = {'ref': genome_ref,
+                         'sort_by': [['feature_id', True]],
+                         'start': 0,
+                         'limit': GENOME_PAGE_SIZE}
+        if structured_query:
+            search_params['structured_query'] = structured_query
+
+        while True:
+            search_result = self.gsu.search(search_params)
+            genome_features = search_result['features']
+
+            for genome_feature in genome_features:
+                yield genome_feature
+
+            search_params['start'] += len(genome_features)
+            search_params['num_found'] = search_result['num_found']
+            if not genome_features or search_params['start'] >= search_result['num_found']:
+                break
+
+    def _iter_workspace_genome_fields(self, genome_ref, included):
+        """
+        _iter_workspace_genome_fields: yield ('ontologies_present', map) and
+                                       (feature array, feature) for every genome feature
+
+        with streaming-json-decode set in the deploy config features are decoded one at a
+        time from the get_objects2 response instead of decoding the whole response at once
+        """
+        get_objects_params = {'objects': [{'ref': genome_ref, 'included': included}]}
+
+        if self.ws_stream is not None:
+            prefixes = ['data.item.data.ontologies_present']
+            prefixes += [f'data.item.data.{feature_array}.item'
+                         for feature_array in GENOME_FEATURE_ARRAYS]
+            for prefix, value in self.ws_stream.call_method_stream('Workspace.get_objects2',
+                                                                   [get_objects_params],
+                                                                   prefixes):
+                yield prefix.split('.')[3], value
+            return
+
+        genome_data = self.ws.get_objects2(get_objects_params)['data'][0]['data']
+        yield 'ontologies_present', genome_data.get('ontologies_present')
+        for feature_array in GENOME_FEATURE_ARRAYS:
+            for feature in genome_data.pop(feature_array, None) or []:
+                yield feature_array, feature
+
+    def _build_workspace_genome_annotation(self, genome_ref):
+        """
+        _build_workspace_genome_annotation: build GenomeAnnotation from genome features read
+                                            straight from the Workspace
+
+        only feature ids and ontology terms are fetched (no sequences or locations); every
+        feature goes into the annotation as it is decoded, which is built in feature id
+        order like the GenomeSearchUtil.search results
+        """
+        included = ['ontologies_present']
+        for feature_array in GENOME_FEATURE_ARRAYS:
+            included += [f'{feature_array}/[*]/{field}' for field in GENOME_FEATURE_FIELDS]
+
+        ontologies_present = {}
+        annotation_builder = GenomeAnnotationBuilder(sort_by_feature_id=True)
+        for field, value in self._iter_workspace_genome_fields(genome_ref, included):
+            if field == 'ontologies_present':
+                ontologies_present = value or {}
+                continue
+
+            feature = value
+            # ontology_terms: ontology namespace to term id to term info (older genomes)
+            # or to ontology event indexes (newer genomes, names in ontologies_present)
+            ontology_terms = {}
+            for namespace, terms in (feature.get('ontology_terms') or {}).items():
+                for term_id, term_info in terms.items():
+                    if isinstance(term_info, dict):
+                        ontology_terms[term_id] = term_info.get('term_name') or ''
                     else:
-                        go_id_feature_id_list_map.update({go_id: [feature_id]})
-            else:
-                feature_id_go_id_list_map.update({feature_id: 'Unlabeled'})
+                        # named in ontologies_present, which may only show up after the
+                        # features when the response is streamed
+                        ontology_terms[term_id] = (namespace, term_id)
 
-        return (feature_id_go_id_list_map, go_id_feature_id_list_map,
-                go_id_go_term_map, feature_id_feature_info_map)
+            annotation_builder.add_feature(feature.get('id'), ontology_terms)
+
+        annotation = annotation_builder.build()
+        annotation.term_names = [
+            ontologies_present.get(term_name[0], {}).get(term_name[1]) or ''
+            if isinstance(term_name, tuple) else term_name
+            for term_name in annotation.term_names]
+
+        return annotation
+
+    def _get_object_upa(self, ref):
+        """
+        _get_object_upa: resolve object reference to its immutable wsid/objid/version form
+        """
+        info = self.ws.get_object_info3({'objects': [{'ref': ref}]})['infos'][0]
+
+        return '{}/{}/{}'.format(info[6], info[0], info[4])
+
+    def _get_genome_annotation(self, genome_ref, genome_upa=None):
+        """
+        _get_genome_annotation: build GenomeAnnotation from genome features
+
+        features are read from the Workspace unless genome-loader is set to
+        genome_search_util in the deploy config
+        features without GO terms are kept as they are part of the reference features
+        annotations are cached under scratch by genome UPA, so repeated runs against the
+        same genome version skip the genome fetch; concurrent runs on the same genome
+        version, in this or other processes sharing scratch, wait for a single load
+        """
+
+        if genome_upa is None:
+            genome_upa = self._get_object_upa(genome_ref)
+        cache_key = 'genome_annotation:{}:{}:{}'.format(genome_upa, self.genome_loader,
+                                                        GENOME_ANNOTATION_CACHE_VERSION)
+
+        return _annotation_flights.do(
+            cache_key, lambda: self._load_genome_annotation(genome_ref, genome_upa, cache_key),
+            lock_dir=os.path.join(self.scratch, 'locks'))
+
+    def _load_genome_annotation(self, genome_ref, genome_upa, cache_key):
+        """
+        _load_genome_annotation: load GenomeAnnotation from the annotation cache, build and
+                                 cache it on cache miss
+        """
+        annotation = self.annotation_cache.get(cache_key)
+        if annotation is not None:
+            log('loaded cached GO annotation of genome {}'.format(genome_upa))
+            return annotation
+
+        log('start parsing GO terms from genome')
+
+        if self.genome_loader == 'genome_search_util':
+            annotation_builder = GenomeAnnotationBuilder()
+            for genome_feature in self._iter_genome_features(genome_ref):
+                annotation_builder.add_feature(genome_feature.get('feature_id'),
+                                               genome_feature.get('ontology_terms'))
+            annotation = annotation_builder.build()
+        else:
+            annotation = self._build_workspace_genome_annotation(genome_ref)
+
+        self.annotation_cache.put(cache_key, annotation)
+
+        return annotation
 
     def _process_feature_set(self, feature_set_ref):
         """
@@ -336,101 +580,286 @@ class FunctionalEnrichmentUtil:
 
         return feature_set_ids, genome_ref_array[0]
 
-    def _get_immediate_parents(self, ontology_hash, go_id, is_a_relationship,
-                               regulates_relationship, part_of_relationship):
-        """
-        _get_immediate_parents: get immediate parents go_ids for a given go_id
-        """
-        parent_ids = []
-        antology_info = ontology_hash.get(go_id, {})
-
-        if is_a_relationship:
-            is_a_parents = antology_info.get('is_a')
-            if is_a_parents:
-                for parent_string in is_a_parents:
-                    is_a_parent_id = parent_string.split('!')[0][:-1]
-                    parent_ids.append(is_a_parent_id)
-
-        if regulates_relationship:
-            relationship = antology_info.get('relationship')
-            if relationship:
-                for relationship_string in relationship:
-                    if relationship_string.split(' ')[0] == 'regulates':
-                        parent_ids.append(relationship_string.split(' ')[1])
-
-        if part_of_relationship:
-            relationship = antology_info.get('relationship')
-            if relationship:
-                for relationship_string in relationship:
-                    if relationship_string.split(' ')[0] == 'part_of':
-                        parent_ids.append(relationship_string.split(' ')[1])
-
-        return parent_ids
-
-    def _fetch_all_parents_go_ids(self, ontology_hash, go_id, is_a_relationship,
-                                  regulates_relationship, part_of_relationship):
-        """
-        _fetch_all_parents_go_ids: recusively fetch all parent go_ids
-        """
-
-        parent_ids = self._get_immediate_parents(ontology_hash, go_id,
-                                                 is_a_relationship, regulates_relationship,
-                                                 part_of_relationship)
-        if parent_ids:
-            grand_parent_ids = parent_ids
-            for parent_id in parent_ids:
-                grand_parent_ids += self._fetch_all_parents_go_ids(ontology_hash, parent_id,
-                                                                   is_a_relationship,
-                                                                   regulates_relationship,
-                                                                   part_of_relationship)[parent_id]
-            return {go_id: list(set(grand_parent_ids))}
-        else:
-            return {go_id: []}
-
-    def _generate_parent_child_map(self, ontology_hash, go_ids,
+    def _generate_parent_child_map(self, ontology, go_ids,
                                    is_a_relationship=True,
                                    regulates_relationship=True,
                                    part_of_relationship=False):
         """
         _generate_parent_child_map: fetch parent go_ids for given go_id
+
+        ancestors are looked up in the ontology's memoized closure for the requested
+        relationship types, which is computed at most once per combination
         """
 
         log('start fetching parent go_ids')
-        start = time.time()
+
+        relationships = [rel for rel, included in [('is_a', is_a_relationship),
+                                                   ('regulates', regulates_relationship),
+                                                   ('part_of', part_of_relationship)]
+                         if included]
 
         go_id_parent_ids_map = {}
 
         for go_id in go_ids:
-            fetch_result = self._fetch_all_parents_go_ids(ontology_hash, go_id,
-                                                          is_a_relationship,
-                                                          regulates_relationship,
-                                                          part_of_relationship)
+            go_id_parent_ids_map[go_id] = ontology.ancestors(go_id, relationships)
+
+        return go_id_parent_ids_map
 
-            go_id_parent_ids_map.update(fetch_result)
+    def _check_feature_set_ids(self, annotation, genome_ref, feature_set_ids):
+        """
+        _check_feature_set_ids: check genome has features and contains all FeatureSet features
+        """
+        if not annotation.feature_count:
+            raise ValueError("No features in the referenced genome ({}) contain ontology mappings"
+                             .format(genome_ref))
 
-        end = time.time()
-        print(f'used {end - start:.2f} s')
+        unknown_feature_ids = set(feature_set_ids) - set(annotation.feature_ids)
+        if unknown_feature_ids:
+            raise ValueError("The specified feature set contains {} feature ids which are not "
+                             "present referenced genome".format(genome_ref))
 
-        return go_id_parent_ids_map
+    def _get_reference_mask(self, annotation, filter_ref_features):
+        """
+        _get_reference_mask: boolean mask of genome features used as reference features
+        """
+        if filter_ref_features:
+            log('start filtering features with no term')
+            return annotation.annotated_features()
+
+        return np.ones(annotation.feature_count, dtype=bool)
+
+    def _get_term_matrix(self, annotation, ontology, propagation):
+        """
+        _get_term_matrix: (features, terms) matrix of genome features of every GO term,
+                          including features of descendant terms if propagation is set
+
+        return:
+        go_id_parent_ids_map: GO term id to ancestor term ids map
+        term_matrix: boolean scipy.sparse.csc_matrix of shape (features, terms)
+        """
+        if propagation:
+            go_id_parent_ids_map = self._generate_parent_child_map(ontology,
+                                                                   annotation.term_ids,
+                                                                   regulates_relationship=False)
+        else:
+            go_id_parent_ids_map = {}
+            for go_id in annotation.term_ids:
+                go_id_parent_ids_map.update({go_id: []})
+
+        log('including parents to feature id map')
+        term_matrix = annotation.propagate(go_id_parent_ids_map)
+
+        return go_id_parent_ids_map, term_matrix
+
+    def _compute_enrichment(self, annotation, ontology, term_matrix, feature_set_masks,
+                            reference_mask, statistical_significance,
+                            ignore_go_term_not_in_feature_set):
+        """
+        _compute_enrichment: GO term enrichment of every FeatureSet
+
+        FeatureSets are split across worker-count processes (deploy config), each process
+        counts its FeatureSets with one product of the term matrix and the FeatureSet masks
+        and runs their contingency tables through a single fisher_exact call;
+        p-values are corrected per FeatureSet
+
+        feature_set_masks: boolean array of shape (features, FeatureSets)
+
+        return:
+        list of enrichment_map, one per FeatureSet
+        """
+
+        log('start calculating p-values')
+        if statistical_significance not in ['left_tailed', 'right_tailed', 'two_tailed']:
+            raise ValueError('Improper statistical_significance value')
+
+        with self.timer.stage('statistics'):
+            statistics = parallel_enrichment_statistics(self.worker_count, term_matrix,
+                                                        feature_set_masks, reference_mask,
+                                                        statistical_significance,
+                                                        ignore_go_term_not_in_feature_set)
+
+        with self.timer.stage('fdr'):
+            adjusted_p_values_list = [p_adjust(raw_p_values, method='fdr')
+                                      for _, _, raw_p_values in statistics]
+
+        with self.timer.stage('statistics'):
+            return self._build_enrichment_maps(annotation, ontology, term_matrix, statistics,
+                                               adjusted_p_values_list)
+
+    def _build_enrichment_maps(self, annotation, ontology, term_matrix, statistics,
+                               adjusted_p_values_list):
+        """
+        _build_enrichment_maps: enrichment_map of every FeatureSet, terms not defined in the
+                                ontology are left out
+        """
+        num_in_ref_genome = np.diff(term_matrix.indptr)
+
+        term_features = {}
+        enrichment_maps = []
+        for (terms, a_values, raw_p_values), adjusted_p_values in zip(statistics,
+                                                                     adjusted_p_values_list):
+            enrichment_map = {}
+            for pos, term in enumerate(terms.tolist()):
+                go_id = annotation.term_ids[term]
+                if go_id not in ontology:
+                    continue
+
+                if term not in term_features:
+                    term_features[term] = annotation.term_features(term_matrix, term)
+
+                namespace = ontology.namespace(go_id)
+                enrichment_map.update({go_id: {
+                    'raw_p_value': float(raw_p_values[pos]),
+                    'adjusted_p_value': float(adjusted_p_values[pos]),
+                    'num_in_ref_genome': int(num_in_ref_genome[term]),
+                    'num_in_subset_feature_set': int(a_values[pos]),
+                    'go_term': annotation.term_names[term],
+                    'namespace': namespace.split("_")[1][0].upper(),
+                    'mapped_features': term_features[term]}})
+            enrichment_maps.append(enrichment_map)
+
+        return enrichment_maps
+
+    def _load_ontology(self):
+        with self.timer.stage('ontology_load'):
+            if self.resident_ontology is not None:
+                ontology = self.resident_ontology.get(RESIDENT_ONTOLOGY_TIMEOUT)
+                if ontology is not None:
+                    return ontology
+            return self.ontology_cache.get_compiled_ontology()
+
+    def _get_ontology_version(self):
+        """
+        _get_ontology_version: version of the ontology _load_ontology returns
+        """
+        if self.resident_ontology is not None:
+            ontology = self.resident_ontology.get(RESIDENT_ONTOLOGY_TIMEOUT)
+            if ontology is not None:
+                return ontology.version
+        return self.ontology_cache.get_ontology_version()
+
+    def _result_cache_key(self, feature_set_upa, genome_upa, ontology_version, params):
+        """
+        _result_cache_key: result cache key of run_fe1 on given object versions with the
+                           enrichment parameters in params, defaults filled in
+        """
+        enrichment_params = {
+            'propagation': bool(params.get('propagation', True)),
+            'filter_ref_features': bool(params.get('filter_ref_features', False)),
+            'statistical_significance': params.get('statistical_significance', 'left_tailed'),
+            'ignore_go_term_not_in_feature_set': bool(
+                params.get('ignore_go_term_not_in_feature_set', True))}
+
+        return 'run_fe1_result:{}:{}:{}:{}:{}'.format(
+            feature_set_upa, genome_upa, ontology_version,
+            json.dumps(enrichment_params, sort_keys=True), RESULT_CACHE_VERSION)
+
+    def _cache_result(self, cache_key, workspace_name, report_output, output_files,
+                      html_directory):
+        """
+        _cache_result: store the report files and report of a run_fe1 result
+        """
+        def read_file(path):
+            with open(path, 'rb') as result_file:
+                return result_file.read()
+
+        self.result_cache.put(cache_key, {
+            'output_files': [dict(output_file, path=os.path.basename(output_file['path']))
+                             for output_file in output_files],
+            'files': {os.path.basename(output_file['path']): read_file(output_file['path'])
+                      for output_file in output_files},
+            'html_files': {file_name: read_file(os.path.join(html_directory, file_name))
+                           for file_name in os.listdir(html_directory)},
+            'workspace_name': workspace_name,
+            'report_output': report_output})
+
+    def _report_cached_result(self, cached_result, result_directory, workspace_name):
+        """
+        _report_cached_result: restore the report files of a cached run_fe1 result into
+                               result_directory and report them
+
+        the cached report is returned as is when result-cache-reuse-report is set and it was
+        saved to workspace_name, otherwise a new report is created from the cached files
+        """
+        with self.timer.stage('file_writing'):
+            output_files = []
+            for output_file in cached_result['output_files']:
+                path = os.path.join(result_directory, output_file['path'])
+                with open(path, 'wb') as result_file:
+                    result_file.write(cached_result['files'][output_file['path']])
+                output_files.append(dict(output_file, path=path))
+
+        if self.reuse_cached_report and cached_result['workspace_name'] == workspace_name:
+            log('returning cached report {}'.format(cached_result['report_output']))
+            return dict(cached_result['report_output'])
+
+        html_directory = os.path.join(self.scratch, str(uuid.uuid4()))
+        self._mkdir_p(html_directory)
+        with self.timer.stage('html'):
+            for file_name, data in cached_result['html_files'].items():
+                with open(os.path.join(html_directory, file_name), 'wb') as html_file:
+                    html_file.write(data)
+        output_html_files = self._upload_html_report(html_directory)
+
+        return self._create_report(workspace_name, output_files, output_html_files)
+
+    def _load_feature_set(self, feature_set_ref):
+        with self.timer.stage('feature_set_load'):
+            return self._process_feature_set(feature_set_ref)
+
+    def _finish_run(self, returnVal, result_directory):
+        """
+        _finish_run: add stage timings to the result and write them to stage_timings.json
+        """
+        self.timer.log_stages()
+        self.timer.save(os.path.join(result_directory, 'stage_timings.json'))
+        returnVal['stage_timings'] = self.timer.stage_timings()
+
+        return returnVal
 
     def _round(self, number, digits=3):
         """
-        round number to given digits
+        round number to given digits, only used when p-values are written out
         """
 
         round_number = format(number, f'.{digits}g')
 
         return round_number
 
-    def __init__(self, config):
+    def __init__(self, config, resident_ontology=None):
+        """
+        config: service configuration
+        resident_ontology: optional ResidentOntology used instead of loading the ontology
+        """
         self.ws_url = config['workspace-url']
         self.callback_url = config['SDK_CALLBACK_URL']
         self.token = config['KB_AUTH_TOKEN']
         self.shock_url = config['shock-url']
         self.scratch = config['scratch']
+        self.genome_loader = config.get('genome-loader', 'workspace')
+        self.timer = StageTimer()
+        self.worker_count = int(config.get('worker-count', 1)) or os.cpu_count() or 1
         self.dfu = DataFileUtil(self.callback_url)
         self.gsu = GenomeSearchUtil(self.callback_url)
+        self.kbase_report = KBaseReport(self.callback_url)
         self.ws = Workspace(self.ws_url, token=self.token)
+        self.ws_stream = None
+        if str(config.get('streaming-json-decode', '')).lower() == 'true':
+            self.ws_stream = BaseClient(self.ws_url, token=self.token)
+        self.resident_ontology = resident_ontology
+        self.ontology_cache = OntologyCache(self.ws, os.path.join(self.scratch, 'ontology_cache'),
+                                            ws_stream=self.ws_stream)
+        self.annotation_cache = DiskCache(os.path.join(self.scratch, 'annotation_cache'),
+                                          config.get('annotation-cache-max-bytes',
+                                                     ANNOTATION_CACHE_MAX_BYTES))
+        self.result_cache = None
+        result_cache_max_bytes = int(config.get('result-cache-max-bytes',
+                                                RESULT_CACHE_MAX_BYTES))
+        if result_cache_max_bytes:
+            self.result_cache = DiskCache(os.path.join(self.scratch, 'result_cache'),
+                                          result_cache_max_bytes)
+        self.reuse_cached_report = str(config.get('result-cache-reuse-report',
+                                                  '')).lower() == 'true'
 
     def run_fe1(self, params):
         """
@@ -449,6 +878,10 @@ class FunctionalEnrichmentUtil:
         ignore_go_term_not_in_feature_set: ignore Go term analysis if term is not associated with
                                            FeatureSet (default is 1)
 
+        results are cached under scratch by FeatureSet, genome and ontology versions and the
+        optional params, a repeated request restores the result files from the cache and
+        reports them again
+
         return:
         result_directory: folder path that holds all files generated by run_deseq2_app
         report_name: report name generated by KBaseReport
@@ -466,128 +899,155 @@ class FunctionalEnrichmentUtil:
         result_directory = os.path.join(self.scratch, str(uuid.uuid4()))
         self._mkdir_p(result_directory)
 
-        feature_set_ids, genome_ref = self._process_feature_set(params.get('feature_set_ref'))
-
-        (feature_id_go_id_list_map,
-         go_id_feature_id_list_map,
-         go_id_go_term_map,
-         feature_id_feature_info_map) = self._get_go_maps_from_genome(genome_ref)
-
-        if not len(feature_id_go_id_list_map):
-            raise ValueError("No features in the referenced genome ({}) contain ontology mappings"
-                             .format(genome_ref))
+        self.timer = StageTimer()
 
-        unknown_feature_ids = set(feature_set_ids) - set(feature_id_feature_info_map.keys())
-        if unknown_feature_ids:
-            raise ValueError("The specified feature set contains {} feature ids which are not "
-                             "present referenced genome".format(genome_ref))
+        # only the genome depends on the FeatureSet, the ontology is fetched alongside both;
+        # with the result cache it is only loaded once no cached result is found
+        executor = ThreadPoolExecutor(max_workers=FETCH_THREAD_COUNT)
+        try:
+            ontology_future = None
+            if self.result_cache is None:
+                ontology_future = executor.submit(self._load_ontology)
+            else:
+                ontology_version_future = executor.submit(self._get_ontology_version)
+                feature_set_upa_future = executor.submit(self._get_object_upa,
+                                                         params.get('feature_set_ref'))
+
+            feature_set_ids, genome_ref = self._load_feature_set(params.get('feature_set_ref'))
+            genome_upa = self._get_object_upa(genome_ref)
+
+            # identical requests on the same object versions reuse the earlier result
+            cached_result = None
+            if self.result_cache is not None:
+                result_cache_key = self._result_cache_key(feature_set_upa_future.result(),
+                                                          genome_upa,
+                                                          ontology_version_future.result(),
+                                                          params)
+                cached_result = self.result_cache.get(result_cache_key)
+            if cached_result is not None:
+                log('found cached result: {}'.format(result_cache_key))
+                returnVal = {'result_directory': result_directory}
+                returnVal.update(self._report_cached_result(cached_result, result_directory,
+                                                            params.get('workspace_name')))
+                return self._finish_run(returnVal, result_directory)
+            if ontology_future is None:
+                ontology_future = executor.submit(self._load_ontology)
+
+            with self.timer.stage('genome_load'):
+                annotation = self._get_genome_annotation(genome_ref, genome_upa)
+            self._check_feature_set_ids(annotation, genome_ref, feature_set_ids)
+
+            ontology = ontology_future.result()
+        finally:
+            executor.shutdown(wait=False)
+
+        reference_mask = self._get_reference_mask(annotation, filter_ref_features)
+        with self.timer.stage('propagation'):
+            go_id_parent_ids_map, term_matrix = self._get_term_matrix(annotation, ontology,
+                                                                      propagation)
+
+        feature_set_masks = annotation.feature_mask(feature_set_ids)[:, np.newaxis]
+        enrichment_map = self._compute_enrichment(annotation, ontology, term_matrix,
+                                                  feature_set_masks, reference_mask,
+                                                  statistical_significance,
+                                                  ignore_go_term_not_in_feature_set)[0]
 
-        if filter_ref_features:
-            log('start filtering features with no term')
-            feature_ids = []
-            for feature_id, go_ids in feature_id_go_id_list_map.items():
-                if isinstance(go_ids, list):
-                    feature_ids.append(feature_id)
-        else:
-            feature_ids = list(feature_id_go_id_list_map.keys())
+        returnVal = {'result_directory': result_directory}
+        report_output, output_files, html_directory = self._generate_report(
+            enrichment_map, result_directory, params.get('workspace_name'), annotation,
+            feature_set_ids, genome_ref, go_id_parent_ids_map, reference_mask)
 
-        ontology_hash = dict()
-        ontologies = self.ws.get_objects([{'workspace': 'KBaseOntology',
-                                           'name': 'gene_ontology'},
-                                          {'workspace': 'KBaseOntology',
-                                           'name': 'plant_ontology'}])
-        ontology_hash.update(ontologies[0]['data']['term_hash'])
-        ontology_hash.update(ontologies[1]['data']['term_hash'])
+        returnVal.update(report_output)
 
-        if propagation:
-            go_id_parent_ids_map = self._generate_parent_child_map(ontology_hash,
-                                                                   list(go_id_go_term_map.keys()),
-                                                                   regulates_relationship=False)
-        else:
-            go_id_parent_ids_map = {}
-            for go_id in go_id_go_term_map.keys():
-                go_id_parent_ids_map.update({go_id: []})
+        if self.result_cache is not None:
+            # keyed by the version of the ontology actually used
+            self._cache_result(self._result_cache_key(feature_set_upa_future.result(),
+                                                      genome_upa, ontology.version, params),
+                               params.get('workspace_name'), report_output, output_files,
+                               html_directory)
 
-        log('including parents to feature id map')
-        for go_id, parent_ids in go_id_parent_ids_map.items():
-            mapped_features = go_id_feature_id_list_map.get(go_id)
+        return self._finish_run(returnVal, result_directory)
 
-            for parent_id in parent_ids:
-                parent_mapped_features = go_id_feature_id_list_map.get(parent_id)
+    def run_fe1_batch(self, params):
+        """
+        run_fe1_batch: Functional Enrichment One on multiple FeatureSets of one Genome
 
-                if not parent_mapped_features:
-                    parent_mapped_features = []
+        the genome annotation and ontology are loaded once and all FeatureSets are tested
+        together, results of all FeatureSets go into a single report
 
-                if mapped_features:
-                    parent_mapped_features += mapped_features
+        required params:
+        feature_set_refs: FeatureSet object references, all FeatureSets must reference the
+                          same Genome
+        workspace_name: the name of the workspace it gets saved to
 
-                go_id_feature_id_list_map.update({parent_id: list(set(parent_mapped_features))})
+        optional params:
+        propagation, filter_ref_features, statistical_significance and
+        ignore_go_term_not_in_feature_set, see run_fe1
 
-        log('start calculating p-values')
-        enrichment_map = {}
-        go_info_map = {}
-        all_raw_p_value = []
-        pos = 0
-        for go_id, go_term in go_id_go_term_map.items():
-            mapped_features = go_id_feature_id_list_map.get(go_id)
-            # in feature_set matches go_id
-            a = len(set(mapped_features).intersection(feature_set_ids))
-            # ignore go term analysis if not associated with FeatureSet
-            if ignore_go_term_not_in_feature_set and a == 0:
-                continue
-            # in feature_set doesn't match go_id
-            b = len(feature_set_ids) - a
-            # not in feature_set matches go_id
-            c = len(mapped_features) - a
-            # not in feature_set doesn't match go_id
-            d = len(feature_ids) - len(feature_set_ids) - c
-
-            fisher_value = fisher.pvalue(a, b, c, d)
-            if statistical_significance == 'left_tailed':
-                raw_p_value = self._round(fisher_value.left_tail)
-            elif statistical_significance == 'right_tailed':
-                raw_p_value = self._round(fisher_value.right_tail)
-            elif statistical_significance == 'two_tailed':
-                raw_p_value = self._round(fisher_value.two_tail)
-            else:
-                raise ValueError('Improper statistical_significance value')
+        return:
+        result_directory: folder path that holds all files generated by run_fe1_batch
+        report_name: report name generated by KBaseReport
+        report_ref: report reference generated by KBaseReport
+        """
+        log('--->\nrunning FunctionalEnrichmentUtil.run_fe1_batch\n' +
+            f'params:\n{json.dumps(params, indent=1)}')
 
-            all_raw_p_value.append(raw_p_value)
-            go_info_map.update({go_id: {'raw_p_value': raw_p_value,
-                                        'num_in_ref_genome': len(mapped_features),
-                                        'num_in_subset_feature_set': a,
-                                        'pos': pos,
-                                        'mapped_features': mapped_features}})
-            pos += 1
+        self._validate_run_fe1_batch_params(params)
+        propagation = params.get('propagation', True)
+        filter_ref_features = params.get('filter_ref_features', False)
+        statistical_significance = params.get('statistical_significance', 'left_tailed')
+        ignore_go_term_not_in_feature_set = params.get('ignore_go_term_not_in_feature_set', True)
+        feature_set_refs = params.get('feature_set_refs')
 
-        stats = importr('stats')
-        adjusted_p_values = stats.p_adjust(FloatVector(all_raw_p_value), method='fdr')
+        result_directory = os.path.join(self.scratch, str(uuid.uuid4()))
+        self._mkdir_p(result_directory)
 
-        for go_id, go_info in go_info_map.items():
-            if go_id not in ontology_hash:
-                continue
+        self.timer = StageTimer()
 
-            adjusted_p_value = self._round(adjusted_p_values[go_info.get('pos')])
-            namespace = ontology_hash[go_id]['namespace']
-            enrichment_map.update({go_id: {'raw_p_value': go_info.get('raw_p_value'),
-                                           'adjusted_p_value': adjusted_p_value,
-                                           'num_in_ref_genome': go_info.get('num_in_ref_genome'),
-                                           'num_in_subset_feature_set':
-                                           go_info.get('num_in_subset_feature_set'),
-                                           'go_term': go_id_go_term_map.get(go_id),
-                                           'namespace': namespace.split("_")[1][0].upper(),
-                                           'mapped_features': go_info.get('mapped_features')}})
+        executor = ThreadPoolExecutor(max_workers=FETCH_THREAD_COUNT)
+        try:
+            ontology_future = executor.submit(self._load_ontology)
+
+            feature_sets = list(executor.map(self._load_feature_set, feature_set_refs))
+            feature_set_ids_list = [feature_set_ids for feature_set_ids, _ in feature_sets]
+            genome_refs = [genome_ref for _, genome_ref in feature_sets]
+
+            genome_upas = set(executor.map(self._get_object_upa, set(genome_refs)))
+            if len(genome_upas) > 1:
+                error_msg = 'FeatureSets reference multiple Genomes: {}'.format(
+                    sorted(genome_upas))
+                raise ValueError(error_msg)
+            genome_ref = genome_refs[0]
+
+            with self.timer.stage('genome_load'):
+                annotation = self._get_genome_annotation(genome_ref)
+            for feature_set_ids in feature_set_ids_list:
+                self._check_feature_set_ids(annotation, genome_ref, feature_set_ids)
+
+            ontology = ontology_future.result()
+        finally:
+            executor.shutdown(wait=False)
+
+        reference_mask = self._get_reference_mask(annotation, filter_ref_features)
+        with self.timer.stage('propagation'):
+            _, term_matrix = self._get_term_matrix(annotation, ontology, propagation)
+
+        feature_set_masks = np.zeros((annotation.feature_count, len(feature_set_refs)),
+                                     dtype=bool)
+        for feature_set, feature_set_ids in enumerate(feature_set_ids_list):
+            feature_set_masks[:, feature_set] = annotation.feature_mask(feature_set_ids)
+
+        enrichment_maps = self._compute_enrichment(annotation, ontology, term_matrix,
+                                                   feature_set_masks, reference_mask,
+                                                   statistical_significance,
+                                                   ignore_go_term_not_in_feature_set)
 
         returnVal = {'result_directory': result_directory}
-        report_output = self._generate_report(enrichment_map,
-                                              result_directory,
-                                              params.get('workspace_name'),
-                                              feature_id_go_id_list_map,
-                                              feature_set_ids,
-                                              genome_ref,
-                                              go_id_parent_ids_map,
-                                              feature_ids)
+        report_output = self._generate_batch_report(enrichment_maps,
+                                                    feature_set_refs,
+                                                    result_directory,
+                                                    params.get('workspace_name'))
 
         returnVal.update(report_output)
 
-        return returnVal
+        return self._finish_run(returnVal, result_directory)
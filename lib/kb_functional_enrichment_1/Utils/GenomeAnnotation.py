@@ -0,0 +1,179 @@
+import re
+from array import array
+
+import numpy as np
+import scipy.sparse as sparse
+
+GO_ID_PATTERN = re.compile(r'[gG][oO]\:.*')
+
+
+class GenomeAnnotation:
+    """
+    GenomeAnnotation: GO annotation of genome features
+
+    feature_ids: genome feature ids, in the order they were given to the builder or in
+                 feature id order
+    term_ids: GO term ids annotated to at least one feature
+    term_names: GO term name of every term as given in the genome
+    matrix: boolean scipy.sparse.csr_matrix of shape (features, terms), row order follows
+            feature_ids and column order follows term_ids
+    """
+
+    def __init__(self, feature_ids, term_ids, term_names, matrix):
+        self.feature_ids = feature_ids
+        self.term_ids = term_ids
+        self.term_names = term_names
+        self.matrix = matrix
+        self.feature_index = {feature_id: index for index, feature_id in enumerate(feature_ids)}
+        self.term_index = {term_id: index for index, term_id in enumerate(term_ids)}
+
+    @property
+    def feature_count(self):
+        return len(self.feature_ids)
+
+    @property
+    def term_count(self):
+        return len(self.term_ids)
+
+    def annotated_features(self):
+        """
+        annotated_features: boolean mask of features with at least one GO term
+        """
+        return np.diff(self.matrix.indptr) > 0
+
+    def feature_mask(self, feature_ids):
+        """
+        feature_mask: boolean mask of given feature ids, unknown feature ids are ignored
+        """
+        mask = np.zeros(self.feature_count, dtype=bool)
+        mask[[self.feature_index[feature_id] for feature_id in feature_ids
+              if feature_id in self.feature_index]] = True
+
+        return mask
+
+    def feature_terms(self, feature):
+        """
+        feature_terms: GO term ids of feature at given index
+        """
+        indptr = self.matrix.indptr
+        return [self.term_ids[term]
+                for term in self.matrix.indices[indptr[feature]:indptr[feature + 1]]]
+
+    def closure_matrix(self, go_id_parent_ids_map):
+        """
+        closure_matrix: boolean (terms, terms) csr_matrix, entry [term, ancestor] is set for
+                        every term itself and every ancestor term annotated in the genome
+
+        go_id_parent_ids_map: GO term id to all ancestor term ids map
+        """
+        rows = list(range(self.term_count))
+        columns = list(range(self.term_count))
+        for go_id, parent_ids in go_id_parent_ids_map.items():
+            term = self.term_index.get(go_id)
+            if term is None:
+                continue
+            parents = [self.term_index[parent_id] for parent_id in parent_ids
+                       if parent_id in self.term_index]
+            rows += [term] * len(parents)
+            columns += parents
+
+        closure = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, columns)),
+                                    shape=(self.term_count, self.term_count))
+
+        return closure.astype(bool)
+
+    def propagate(self, go_id_parent_ids_map):
+        """
+        propagate: features of every term including features of all its descendant terms,
+                   computed as the boolean product of the annotation and closure matrices
+
+        go_id_parent_ids_map: GO term id to all ancestor term ids map
+
+        return:
+        boolean scipy.sparse.csc_matrix of shape (features, terms)
+        """
+        closure = self.closure_matrix(go_id_parent_ids_map)
+        propagated = self.matrix.astype(np.int32).dot(closure.astype(np.int32))
+        propagated = propagated.astype(bool).tocsc()
+        propagated.sort_indices()
+
+        return propagated
+
+    def term_features(self, term_matrix, term):
+        """
+        term_features: feature ids of column term in given (features, terms) csc_matrix
+        """
+        indptr = term_matrix.indptr
+        return [self.feature_ids[feature]
+                for feature in term_matrix.indices[indptr[term]:indptr[term + 1]]]
+
+
+class GenomeAnnotationBuilder:
+    """
+    GenomeAnnotationBuilder: incrementally build GenomeAnnotation from genome features
+
+    with sort_by_feature_id set, features may be added in any order and the annotation is
+    built as if they had been added sorted by feature id: rows follow feature id order,
+    terms are numbered in order of first use and every term name comes from the last
+    feature in that order
+    """
+
+    def __init__(self, sort_by_feature_id=False):
+        self.sort_by_feature_id = sort_by_feature_id
+        self.feature_ids = []
+        self.term_ids = []
+        self.term_names = []
+        # feature id the term name was taken from
+        self.term_name_feature_ids = []
+        self.term_index = {}
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+
+    def add_feature(self, feature_id, ontology_terms):
+        """
+        add_feature: add one genome feature
+
+        ontology_terms: ontology term id to term name map, non GO terms are ignored
+        """
+        self.feature_ids.append(feature_id)
+
+        for ontology_id, ontology_term in (ontology_terms or {}).items():
+            if not GO_ID_PATTERN.match(ontology_id):
+                continue
+            term = self.term_index.get(ontology_id)
+            if term is None:
+                term = len(self.term_ids)
+                self.term_index[ontology_id] = term
+                self.term_ids.append(ontology_id)
+                self.term_names.append(ontology_term)
+                self.term_name_feature_ids.append(feature_id)
+            elif (not self.sort_by_feature_id or
+                    feature_id >= self.term_name_feature_ids[term]):
+                self.term_names[term] = ontology_term
+                self.term_name_feature_ids[term] = feature_id
+            self.indices.append(term)
+        self.indptr.append(len(self.indices))
+
+    def build(self):
+        indptr = np.frombuffer(self.indptr, dtype=np.int64).copy()
+        indices = np.frombuffer(self.indices, dtype=np.int32).copy()
+        matrix = sparse.csr_matrix((np.ones(len(indices), dtype=bool), indices, indptr),
+                                   shape=(len(self.feature_ids), len(self.term_ids)))
+        if not self.sort_by_feature_id:
+            return GenomeAnnotation(self.feature_ids, self.term_ids, self.term_names, matrix)
+
+        order = sorted(range(len(self.feature_ids)), key=self.feature_ids.__getitem__)
+        feature_ids = [self.feature_ids[feature] for feature in order]
+        matrix = matrix[np.array(order, dtype=np.intp)]
+
+        # renumber terms in order of first use in the sorted rows
+        _, first_use = np.unique(matrix.indices, return_index=True)
+        term_order = np.argsort(first_use, kind='stable')
+        new_terms = np.empty(len(term_order), dtype=np.int32)
+        new_terms[term_order] = np.arange(len(term_order), dtype=np.int32)
+        matrix = sparse.csr_matrix((matrix.data, new_terms[matrix.indices], matrix.indptr),
+                                   shape=matrix.shape)
+
+        return GenomeAnnotation(feature_ids,
+                                [self.term_ids[term] for term in term_order],
+                                [self.term_names[term] for term in term_order], matrix)
@@ -0,0 +1,230 @@
+import array
+import configparser
+import json
+import os
+import socket
+import socketserver
+import sys
+import traceback
+
+from kb_functional_enrichment_1.Utils.Common import log
+
+
+# seconds a forwarding client waits to connect to the job daemon before running the job itself
+CONNECT_TIMEOUT = 5
+# environment of the forwarding client every job runs with
+JOB_ENVIRONMENT = ['SDK_CALLBACK_URL', 'KB_AUTH_TOKEN']
+
+USAGE = '''usage:
+  python -m kb_functional_enrichment_1.Utils.JobDaemon --serve
+      run async jobs sent to the job-daemon-socket of the deployment config
+  python -m kb_functional_enrichment_1.Utils.JobDaemon input.json output.json [token]
+      run an async job on the job daemon, or in this process when no daemon is running'''
+
+
+def _receive_request(connection):
+    """
+    _receive_request: read job request line and the stdout/stderr descriptors sent with it
+    """
+    fds = array.array('i')
+    data, ancdata, _, _ = connection.recvmsg(65536, socket.CMSG_LEN(2 * fds.itemsize))
+    for level, message_type, cmsg_data in ancdata:
+        if level == socket.SOL_SOCKET and message_type == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[:len(cmsg_data) - len(cmsg_data) % fds.itemsize])
+    while not data.endswith(b'\n'):
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+
+    return json.loads(data.decode('utf-8')), list(fds)
+
+
+class _JobHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        exit_code = 500
+        try:
+            request, fds = _receive_request(self.request)
+            # the job logs to the stdout and stderr of the forwarding client
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for target, fd in zip([1, 2], fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            os.chdir(request['cwd'])
+            exit_code = self.server.run_job(request)
+        except Exception:
+            log('async job failed:\n{}'.format(traceback.format_exc()))
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        self.request.sendall((json.dumps({'exit_code': exit_code}) + '\n').encode('utf-8'))
+
+
+class JobDaemon(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """
+    JobDaemon: runs async jobs sent over a local unix socket
+
+    every job runs in a process forked from the daemon, so it starts with the modules and
+    data the daemon preloaded and a crashing job does not take the daemon down; the job
+    runs in the working directory and writes to the stdout and stderr of the client
+    """
+
+    def __init__(self, socket_path, run_job):
+        """
+        socket_path: unix socket to listen on, replaced if it exists
+        run_job: function taking a job request dict and returning the job exit code
+        """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.socket_path = socket_path
+        self.run_job = run_job
+        # only the user running the daemon may submit jobs, the socket is created without
+        # group and other permissions so nobody else can connect before it is listening
+        umask = os.umask(0o077)
+        try:
+            socketserver.UnixStreamServer.__init__(self, socket_path, _JobHandler)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def forward_job(socket_path, request):
+    """
+    forward_job: run job request on the job daemon listening on socket_path, the job runs
+                 in the current working directory and writes to the current stdout/stderr
+
+    return:
+    job exit code, None when no daemon accepts the job
+    """
+    if not os.path.exists(socket_path):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(CONNECT_TIMEOUT)
+        try:
+            client.connect(socket_path)
+        except OSError as e:
+            log('job daemon not available on {}: {}'.format(socket_path, e))
+            return None
+        # jobs take as long as they take once the daemon accepted them
+        client.settimeout(None)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        request = dict(request, cwd=os.getcwd())
+        fds = array.array('i', [sys.stdout.fileno(), sys.stderr.fileno()])
+        client.sendmsg([(json.dumps(request) + '\n').encode('utf-8')],
+                       [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)])
+        response = client.makefile('rb').readline()
+    finally:
+        client.close()
+
+    if not response:
+        raise RuntimeError('Job daemon on {} closed the connection'.format(socket_path))
+
+    return json.loads(response.decode('utf-8'))['exit_code']
+
+
+def _get_job_daemon_socket():
+    """
+    _get_job_daemon_socket: job-daemon-socket of the deployment config, None when not set
+
+    read without importing the service, which a forwarding client does not need
+    """
+    config_file = os.environ.get('KB_DEPLOYMENT_CONFIG')
+    if not config_file:
+        return None
+    config = configparser.ConfigParser()
+    config.read(config_file)
+    section = os.environ.get('KB_SERVICE_NAME') or 'kb_functional_enrichment_1'
+    if not config.has_section(section):
+        return None
+
+    return config.get(section, 'job-daemon-socket', fallback=None) or None
+
+
+def _run_daemon_job(request):
+    # runs in a process forked from the job daemon, with the callback URL and token of the
+    # client that forwarded the job; never with the daemon's own
+    missing = [key for key in JOB_ENVIRONMENT if not request.get(key)]
+    if missing:
+        raise ValueError('Job request is missing {}'.format(', '.join(missing)))
+
+    from kb_functional_enrichment_1 import kb_functional_enrichment_1Server as server
+    for key in JOB_ENVIRONMENT:
+        os.environ[key] = request[key]
+        server.impl_kb_functional_enrichment_1.config[key] = request[key]
+    return server.process_async_cli(request['input'], request['output'], request.get('token'))
+
+
+def serve_async_jobs(socket_path):
+    """
+    serve_async_jobs: run async jobs forwarded over the unix socket socket_path, each in a
+                      process forked from this one after the enrichment code and the
+                      ontology are loaded
+    """
+    from kb_functional_enrichment_1 import kb_functional_enrichment_1Server as server
+    server.impl_kb_functional_enrichment_1.preload()
+    daemon = JobDaemon(socket_path, _run_daemon_job)
+    log('running async jobs sent to {}'.format(socket_path))
+    try:
+        daemon.serve_forever()
+    finally:
+        daemon.server_close()
+
+
+def run_async_job(input_file_path, output_file_path, token):
+    """
+    run_async_job: run an async job on the configured job daemon, or in this process when
+                   no daemon is configured or running
+
+    return:
+    job exit code
+    """
+    socket_path = _get_job_daemon_socket()
+    exit_code = None
+    # jobs only go to the daemon with the callback URL and token they run with
+    if socket_path and all(os.environ.get(key) for key in JOB_ENVIRONMENT):
+        request = {'input': os.path.abspath(input_file_path),
+                   'output': os.path.abspath(output_file_path),
+                   'token': token}
+        request.update({key: os.environ[key] for key in JOB_ENVIRONMENT})
+        exit_code = forward_job(socket_path, request)
+    if exit_code is None:
+        from kb_functional_enrichment_1 import kb_functional_enrichment_1Server as server
+        exit_code = server.process_async_cli(input_file_path, output_file_path, token)
+
+    return exit_code
+
+
+def main(argv):
+    if argv == ['--serve']:
+        socket_path = _get_job_daemon_socket()
+        if not socket_path:
+            print('job-daemon-socket is not set in the deployment config')
+            return 2
+        serve_async_jobs(socket_path)
+        return 0
+
+    if 2 <= len(argv) <= 3 and os.path.isfile(argv[0]):
+        token = None
+        if len(argv) == 3:
+            if os.path.isfile(argv[2]):
+                with open(argv[2]) as token_file:
+                    token = token_file.read()
+            else:
+                token = argv[2]
+        return run_async_job(argv[0], argv[1], token)
+
+    print(USAGE)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
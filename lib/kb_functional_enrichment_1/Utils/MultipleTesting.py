@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+
+# p-value adjustment methods, named as in R's stats::p.adjust
+P_ADJUST_METHODS = ('holm', 'hochberg', 'hommel', 'bonferroni', 'BH', 'BY', 'fdr', 'none')
+
+
+def _holm(p, n):
+    i = np.arange(1, len(p) + 1)
+    o = np.argsort(p, kind='stable')
+    ro = np.argsort(o, kind='stable')
+
+    return np.minimum(1, np.maximum.accumulate((n + 1 - i) * p[o]))[ro]
+
+
+def _step_up(p, factors):
+    """
+    _step_up: pmin(1, cummin(factors * p[o]))[ro] with o ordering p decreasingly
+    """
+    o = np.argsort(-p, kind='stable')
+    ro = np.argsort(o, kind='stable')
+
+    return np.minimum(1, np.minimum.accumulate(factors * p[o]))[ro]
+
+
+def _hochberg(p, n):
+    i = np.arange(len(p), 0, -1)
+
+    return _step_up(p, n + 1 - i)
+
+
+def _bh(p, n):
+    i = np.arange(len(p), 0, -1)
+
+    return _step_up(p, n / i)
+
+
+def _by(p, n):
+    i = np.arange(len(p), 0, -1)
+    # R accumulates sum() in extended precision, fsum is correctly rounded
+    q = math.fsum(1 / np.arange(1, n + 1))
+
+    return _step_up(p, q * n / i)
+
+
+def _hommel(p, n):
+    lp = len(p)
+    if n > lp:
+        p = np.concatenate([p, np.ones(n - lp)])
+    i = np.arange(1, n + 1)
+    o = np.argsort(p, kind='stable')
+    p = p[o]
+    ro = np.argsort(o, kind='stable')
+
+    q = np.full(n, np.min(n * p / i))
+    pa = q.copy()
+    for m in range(n - 1, 1, -1):
+        i1 = np.arange(n - m + 1)
+        i2 = np.arange(n - m + 1, n)
+        q1 = np.min(m * p[i2] / np.arange(2, m + 1))
+        q[i1] = np.minimum(m * p[i1], q1)
+        q[i2] = q[n - m]
+        pa = np.maximum(pa, q)
+
+    return np.maximum(pa, p)[ro[:lp] if lp < n else ro]
+
+
+def p_adjust(p_values, method='fdr', n=None):
+    """
+    p_adjust: adjust p-values for multiple comparisons
+
+    mirrors R's stats::p.adjust operation by operation so results match R;
+    NaN p-values are kept as NaN and, as in R, don't count towards the default n
+
+    p_values: sequence of raw p-values
+    method: one of P_ADJUST_METHODS
+    n: number of comparisons (default is the number of non-NaN p-values)
+    """
+    if method not in P_ADJUST_METHODS:
+        raise ValueError('Unknown p-value adjustment method: {}'.format(method))
+    if method == 'fdr':
+        method = 'BH'
+
+    p0 = np.array(p_values, dtype=np.float64).ravel()
+    valid = ~np.isnan(p0)
+    p = p0[valid]
+    if n is None:
+        n = len(p)
+    if n < len(p):
+        raise ValueError('n must be at least the number of non-NaN p-values')
+    if n <= 1:
+        return p0
+    if n == 2 and method == 'hommel':
+        method = 'hochberg'
+
+    if method == 'bonferroni':
+        adjusted = np.minimum(1, n * p)
+    elif method == 'holm':
+        adjusted = _holm(p, n)
+    elif method == 'hochberg':
+        adjusted = _hochberg(p, n)
+    elif method == 'hommel':
+        adjusted = _hommel(p, n)
+    elif method == 'BH':
+        adjusted = _bh(p, n)
+    elif method == 'BY':
+        adjusted = _by(p, n)
+    else:
+        adjusted = p
+
+    p0[valid] = adjusted
+
+    return p0
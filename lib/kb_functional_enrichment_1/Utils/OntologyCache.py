@@ -0,0 +1,172 @@
+import glob
+import os
+import pickle
+import uuid
+
+from kb_functional_enrichment_1.Utils.Common import log, mkdir_p
+from kb_functional_enrichment_1.Utils.OntologyCompiler import CompiledOntology, compile_ontology
+from kb_functional_enrichment_1.Utils.SingleFlight import SingleFlight
+
+ONTOLOGY_OBJECTS = [{'workspace': 'KBaseOntology', 'name': 'gene_ontology'},
+                    {'workspace': 'KBaseOntology', 'name': 'plant_ontology'}]
+
+# only the term fields used by run_fe1 are kept in the cached term_hash
+TERM_FIELDS = ('name', 'namespace', 'is_a', 'relationship')
+
+TERM_HASH_FILE_PREFIX = 'term_hash_'
+COMPILED_FILE_PREFIX = 'compiled_ontology_'
+
+# compiled ontology loads in flight in this process, shared by concurrent runs
+_ontology_flights = SingleFlight()
+
+
+class OntologyCache:
+    """
+    OntologyCache: on-disk cache of the merged gene_ontology/plant_ontology term_hash
+                   and of the CompiledOntology built from it
+
+    Cache files are keyed by the UPAs (with version) of the ontology objects, so a
+    cheap get_object_info3 call is enough to tell whether the cached copy is current.
+    """
+
+    def _get_ontology_upas(self):
+        """
+        _get_ontology_upas: get the current versioned references of the ontology objects
+        """
+        infos = self.ws.get_object_info3({'objects': ONTOLOGY_OBJECTS})['infos']
+
+        return ['{}/{}/{}'.format(info[6], info[0], info[4]) for info in infos]
+
+    def _cache_key(self, ontology_upas):
+        """
+        _cache_key: file name friendly key for given ontology references
+        """
+        return '_'.join(upa.replace('/', '.') for upa in ontology_upas)
+
+    def _cache_path(self, prefix, cache_key, extension):
+        return os.path.join(self.cache_dir, prefix + cache_key + extension)
+
+    def _fetch_term_hash(self, ontology_upas):
+        """
+        _fetch_term_hash: download ontology objects and merge their term_hash
+        """
+        log('start downloading ontology objects: {}'.format(ontology_upas))
+
+        get_objects_params = {'objects': [{'ref': upa} for upa in ontology_upas]}
+        if self.ws_stream is None:
+            ontologies = self.ws.get_objects2(get_objects_params)['data']
+            terms = (term for ontology in ontologies
+                     for term in ontology['data']['term_hash'].items())
+        else:
+            # decode one term at a time instead of the whole response
+            terms = (term for _, term in self.ws_stream.call_method_stream(
+                'Workspace.get_objects2', [get_objects_params], ['data.item.data.term_hash.*']))
+
+        ontology_hash = dict()
+        for term_id, term_info in terms:
+            ontology_hash[term_id] = {field: term_info[field]
+                                      for field in TERM_FIELDS if field in term_info}
+
+        return ontology_hash
+
+    def _save(self, prefix, cache_path, write):
+        """
+        _save: atomically write cache file and drop cache files of older ontology versions
+        """
+        mkdir_p(self.cache_dir)
+        tmp_path = '{}.{}.tmp'.format(cache_path, uuid.uuid4())
+        with open(tmp_path, 'wb') as cache_file:
+            write(cache_file)
+        os.replace(tmp_path, cache_path)
+
+        for stale_path in glob.glob(os.path.join(self.cache_dir, prefix + '*')):
+            if stale_path != cache_path and not stale_path.endswith('.tmp'):
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
+
+    def _load_term_hash(self, ontology_upas):
+        """
+        _load_term_hash: load term_hash from cache, download it on cache miss
+        """
+        cache_path = self._cache_path(TERM_HASH_FILE_PREFIX, self._cache_key(ontology_upas),
+                                      '.pickle')
+
+        if os.path.isfile(cache_path):
+            log('loading cached ontology term_hash from {}'.format(cache_path))
+            try:
+                with open(cache_path, 'rb') as cache_file:
+                    return pickle.load(cache_file)
+            except (EOFError, pickle.UnpicklingError) as e:
+                log('ignoring unreadable ontology cache file {}: {}'.format(cache_path, e))
+
+        ontology_hash = self._fetch_term_hash(ontology_upas)
+        self._save(TERM_HASH_FILE_PREFIX, cache_path,
+                   lambda cache_file: pickle.dump(ontology_hash, cache_file,
+                                                  protocol=pickle.HIGHEST_PROTOCOL))
+
+        return ontology_hash
+
+    def __init__(self, ws, cache_dir, ws_stream=None):
+        """
+        ws: Workspace client
+        cache_dir: directory holding the cached term_hash and compiled ontology
+        ws_stream: optional Workspace BaseClient, term_hash is decoded incrementally from
+                   the get_objects2 response stream when given
+        """
+        self.ws = ws
+        self.ws_stream = ws_stream
+        self.cache_dir = cache_dir
+
+    def get_term_hash(self):
+        """
+        get_term_hash: return merged term_hash of gene_ontology and plant_ontology
+
+        return:
+        ontology_hash: term id to term info (name, namespace, is_a, relationship) map
+        """
+        return self._load_term_hash(self._get_ontology_upas())
+
+    def get_ontology_version(self):
+        """
+        get_ontology_version: version string of the current gene_ontology and plant_ontology
+                              objects, the version attribute of the compiled ontology
+        """
+        return self._cache_key(self._get_ontology_upas())
+
+    def get_compiled_ontology(self):
+        """
+        get_compiled_ontology: return CompiledOntology of gene_ontology and plant_ontology
+
+        the term_hash is only loaded when no compiled ontology is cached for the current
+        ontology versions; concurrent calls, in this or other processes sharing cache_dir,
+        wait for a single load
+        """
+        return _ontology_flights.do('compiled_ontology:' + os.path.abspath(self.cache_dir),
+                                    self._load_compiled_ontology, lock_dir=self.cache_dir)
+
+    def _load_compiled_ontology(self):
+        """
+        _load_compiled_ontology: load compiled ontology from cache, compile it on cache miss
+        """
+        ontology_upas = self._get_ontology_upas()
+        cache_key = self._cache_key(ontology_upas)
+        cache_path = self._cache_path(COMPILED_FILE_PREFIX, cache_key, '.ontology')
+
+        ontology = None
+        if os.path.isfile(cache_path):
+            log('loading cached compiled ontology from {}'.format(cache_path))
+            try:
+                ontology = CompiledOntology.load(cache_path)
+            except (OSError, ValueError, KeyError) as e:
+                log('ignoring unreadable ontology cache file {}: {}'.format(cache_path, e))
+
+        if ontology is None:
+            log('start compiling ontology')
+            ontology = compile_ontology(self._load_term_hash(ontology_upas))
+            self._save(COMPILED_FILE_PREFIX, cache_path, ontology.save)
+
+        ontology.version = cache_key
+
+        return ontology
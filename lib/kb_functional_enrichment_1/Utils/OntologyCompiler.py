@@ -0,0 +1,389 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+RELATIONSHIP_TYPES = ('is_a', 'regulates', 'part_of')
+
+# ancestor closures computed at compile time and saved with the compiled ontology
+PRECOMPUTED_CLOSURES = [('is_a',)]
+
+# compiled ontology file: magic, header length, JSON header describing the arrays, then the
+# raw array data, every array starting on an ARRAY_ALIGNMENT boundary
+FILE_MAGIC = b'KBFEONT1'
+ARRAY_ALIGNMENT = 64
+
+
+def _pack_strings(strings):
+    """
+    _pack_strings: pack list of strings into utf-8 blob and offsets arrays
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    return offsets, blob
+
+
+def _unpack_strings(offsets, blob):
+    """
+    _unpack_strings: unpack strings packed by _pack_strings
+    """
+    data = blob.tobytes()
+    offsets = offsets.tolist()
+
+    return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+def _unpack_string(offsets, blob, index):
+    """
+    _unpack_string: unpack the index-th string packed by _pack_strings
+    """
+    return blob[offsets[index]:offsets[index + 1]].tobytes().decode('utf-8')
+
+
+def _aligned(offset):
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def _to_csr(rows):
+    """
+    _to_csr: convert list of index lists into CSR (indptr, indices) arrays
+    """
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(row) for row in rows])
+    indices = np.fromiter((index for row in rows for index in row), dtype=np.int32,
+                          count=int(indptr[-1]))
+
+    return indptr, indices
+
+
+def _relationship_key(relationships):
+    """
+    _relationship_key: canonical tuple of relationship types
+    """
+    unknown = set(relationships) - set(RELATIONSHIP_TYPES)
+    if unknown:
+        raise ValueError('Unknown ontology relationship types: {}'.format(sorted(unknown)))
+
+    return tuple(rel for rel in RELATIONSHIP_TYPES if rel in relationships)
+
+
+def _parse_parents(term_info):
+    """
+    _parse_parents: yield (relationship_type, parent_id) pairs of a term_hash entry
+    """
+    for parent_string in term_info.get('is_a') or []:
+        yield 'is_a', parent_string.split('!')[0][:-1]
+
+    for relationship_string in term_info.get('relationship') or []:
+        relationship_items = relationship_string.split(' ')
+        if relationship_items[0] in ('regulates', 'part_of'):
+            yield relationship_items[0], relationship_items[1]
+
+
+class CompiledOntology:
+    """
+    CompiledOntology: integer indexed ontology DAG held in flat numpy arrays
+
+    Term ids and names are packed utf-8 strings, term ids are looked up by binary search
+    in a sorted copy. Parents are stored per relationship type as CSR adjacency arrays and
+    ancestor closures as CSR arrays keyed by relationship type combination.
+    Terms referenced as parents but missing from the term_hash get namespace code -1.
+
+    An ontology loaded from a file keeps its arrays on a read-only memory map of the file,
+    so processes loading the same file share one copy in the page cache and loading does
+    not parse anything.
+    """
+
+    def __init__(self, arrays):
+        """
+        arrays: array name to numpy array map, as written by save
+        """
+        self.arrays = arrays
+        # versions of the ontology objects this was compiled from, set by OntologyCache
+        self.version = None
+        self.namespaces = _unpack_strings(arrays['namespace_offsets'], arrays['namespace_blob'])
+        self.namespace_codes = arrays['namespace_codes']
+        self.adjacency = {rel: (arrays['adjacency__{}__indptr'.format(rel)],
+                                arrays['adjacency__{}__indices'.format(rel)])
+                          for rel in RELATIONSHIP_TYPES}
+        self.closures = {}
+        for array_name in arrays:
+            if array_name.startswith('closure__') and array_name.endswith('__indptr'):
+                key = array_name.split('__')[1]
+                self.closures[tuple(key.split('+'))] = (
+                    arrays[array_name], arrays['closure__{}__indices'.format(key)])
+
+    def __contains__(self, term_id):
+        index = self.term_index(term_id)
+        return index is not None and self.namespace_codes[index] >= 0
+
+    def __len__(self):
+        return len(self.namespace_codes)
+
+    @property
+    def term_ids(self):
+        return _unpack_strings(self.arrays['term_id_offsets'], self.arrays['term_id_blob'])
+
+    @property
+    def names(self):
+        return _unpack_strings(self.arrays['name_offsets'], self.arrays['name_blob'])
+
+    def term_id(self, index):
+        """
+        term_id: term id of given term index
+        """
+        return _unpack_string(self.arrays['term_id_offsets'], self.arrays['term_id_blob'], index)
+
+    def term_index(self, term_id):
+        """
+        term_index: index of given term id, None if term is unknown
+        """
+        sorted_term_ids = self.arrays['sorted_term_ids']
+        key = term_id.encode('utf-8')
+        if len(key) > sorted_term_ids.dtype.itemsize:
+            return None
+        pos = int(np.searchsorted(sorted_term_ids, key))
+        if pos == len(sorted_term_ids) or sorted_term_ids[pos] != key:
+            return None
+        return int(self.arrays['sorted_term_order'][pos])
+
+    def namespace(self, term_id):
+        """
+        namespace: namespace of given term, None if term is not defined
+        """
+        index = self.term_index(term_id)
+        if index is None or self.namespace_codes[index] < 0:
+            return None
+        return self.namespaces[self.namespace_codes[index]]
+
+    def _parent_lists(self, relationships):
+        """
+        _parent_lists: immediate parents of every term over given relationship types
+        """
+        parents = [[] for _ in range(len(self))]
+        for rel in relationships:
+            indptr, indices = self.adjacency[rel]
+            indptr = indptr.tolist()
+            indices = indices.tolist()
+            for term in range(len(parents)):
+                parents[term] += indices[indptr[term]:indptr[term + 1]]
+
+        return parents
+
+    def _compute_closure(self, relationships):
+        """
+        _compute_closure: compute ancestors of every term over given relationship types
+
+        terms are visited in a single iterative depth first traversal (Tarjan's strongly
+        connected components) that finishes parents before children, so every term's
+        ancestor set is the union of its parents' memoized sets. Terms on a cycle share
+        one ancestor set.
+        """
+        parents = self._parent_lists(relationships)
+        term_count = len(parents)
+
+        visit_index = [-1] * term_count
+        lowlink = [0] * term_count
+        on_stack = [False] * term_count
+        component_stack = []
+        closure = [None] * term_count
+        counter = 0
+
+        for root in range(term_count):
+            if visit_index[root] >= 0:
+                continue
+            work = [(root, 0)]
+            while work:
+                term, parent_pos = work[-1]
+                if visit_index[term] < 0:
+                    visit_index[term] = lowlink[term] = counter
+                    counter += 1
+                    component_stack.append(term)
+                    on_stack[term] = True
+
+                term_parents = parents[term]
+                if parent_pos < len(term_parents):
+                    work[-1] = (term, parent_pos + 1)
+                    parent = term_parents[parent_pos]
+                    if visit_index[parent] < 0:
+                        work.append((parent, 0))
+                    elif on_stack[parent]:
+                        lowlink[term] = min(lowlink[term], visit_index[parent])
+                    continue
+
+                work.pop()
+                if work:
+                    child = work[-1][0]
+                    lowlink[child] = min(lowlink[child], lowlink[term])
+
+                if lowlink[term] != visit_index[term]:
+                    continue
+
+                component = []
+                while True:
+                    member = component_stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == term:
+                        break
+
+                ancestors = set(component) if len(component) > 1 else set()
+                for member in component:
+                    for parent in parents[member]:
+                        ancestors.add(parent)
+                        if closure[parent] is not None:
+                            ancestors.update(closure[parent])
+                for member in component:
+                    closure[member] = ancestors
+
+        return _to_csr([sorted(ancestors - {term}) for term, ancestors in enumerate(closure)])
+
+    def ancestor_closure(self, relationships):
+        """
+        ancestor_closure: CSR (indptr, indices) of all ancestors of every term
+        """
+        key = _relationship_key(relationships)
+        if key not in self.closures:
+            self.closures[key] = self._compute_closure(key)
+
+        return self.closures[key]
+
+    def ancestors(self, term_id, relationships):
+        """
+        ancestors: all ancestor term ids of given term over given relationship types
+        """
+        index = self.term_index(term_id)
+        if index is None:
+            return []
+
+        indptr, indices = self.ancestor_closure(relationships)
+
+        return [self.term_id(i) for i in indices[indptr[index]:indptr[index + 1]].tolist()]
+
+    def save(self, file_obj):
+        """
+        save: write compiled ontology, including the closures computed so far, as a flat
+              file load can memory map
+        """
+        arrays = {name: array for name, array in self.arrays.items()
+                  if not name.startswith('closure__')}
+        for key, (indptr, indices) in self.closures.items():
+            arrays['closure__{}__indptr'.format('+'.join(key))] = indptr
+            arrays['closure__{}__indices'.format('+'.join(key))] = indices
+
+        entries = []
+        offset = 0
+        for name in sorted(arrays):
+            array = np.ascontiguousarray(arrays[name])
+            offset = _aligned(offset)
+            entries.append({'name': name, 'dtype': array.dtype.str, 'shape': array.shape,
+                            'offset': offset})
+            offset += array.nbytes
+        header = json.dumps({'arrays': entries}).encode('utf-8')
+        data_start = _aligned(len(FILE_MAGIC) + 8 + len(header))
+
+        file_obj.write(FILE_MAGIC + struct.pack('<Q', len(header)) + header)
+        position = len(FILE_MAGIC) + 8 + len(header)
+        for entry in entries:
+            file_obj.write(b'\0' * (data_start + entry['offset'] - position))
+            data = np.ascontiguousarray(arrays[entry['name']]).tobytes()
+            file_obj.write(data)
+            position = data_start + entry['offset'] + len(data)
+
+    @classmethod
+    def load(cls, file_path):
+        """
+        load: memory map compiled ontology file written by save
+        """
+        with open(file_path, 'rb') as ontology_file:
+            buffer = mmap.mmap(ontology_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls.from_buffer(buffer)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """
+        from_buffer: compiled ontology backed by the bytes of a file written by save
+        """
+        header_start = len(FILE_MAGIC) + 8
+        if len(buffer) < header_start or bytes(buffer[:len(FILE_MAGIC)]) != FILE_MAGIC:
+            raise ValueError('Not a compiled ontology file')
+        header_length = struct.unpack_from('<Q', buffer, len(FILE_MAGIC))[0]
+        header = json.loads(bytes(buffer[header_start:header_start + header_length])
+                            .decode('utf-8'))
+        data_start = _aligned(header_start + header_length)
+
+        arrays = {}
+        for entry in header['arrays']:
+            dtype = np.dtype(entry['dtype'])
+            shape = tuple(entry['shape'])
+            count = int(np.prod(shape))
+            offset = data_start + entry['offset']
+            if offset + count * dtype.itemsize > len(buffer):
+                raise ValueError('Truncated compiled ontology file')
+            if count:
+                array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            else:
+                array = np.empty(0, dtype=dtype)
+            arrays[entry['name']] = array.reshape(shape)
+
+        return cls(arrays)
+
+
+def compile_ontology(ontology_hash):
+    """
+    compile_ontology: compile term_hash into CompiledOntology
+
+    parent strings in is_a and relationship are parsed once here, and ancestor closures
+    listed in PRECOMPUTED_CLOSURES are computed ahead of time
+    """
+    term_ids = list(ontology_hash.keys())
+    term_index = {term_id: index for index, term_id in enumerate(term_ids)}
+
+    parent_rows = {rel: [] for rel in RELATIONSHIP_TYPES}
+    for term_id in ontology_hash:
+        term_parents = {rel: [] for rel in RELATIONSHIP_TYPES}
+        for rel, parent_id in _parse_parents(ontology_hash[term_id]):
+            if parent_id not in term_index:
+                term_index[parent_id] = len(term_ids)
+                term_ids.append(parent_id)
+            term_parents[rel].append(term_index[parent_id])
+        for rel in RELATIONSHIP_TYPES:
+            parent_rows[rel].append(term_parents[rel])
+
+    # terms only known as parents have no parents of their own
+    for rel in RELATIONSHIP_TYPES:
+        parent_rows[rel] += [[] for _ in range(len(term_ids) - len(parent_rows[rel]))]
+
+    namespaces = sorted({term_info['namespace'] for term_info in ontology_hash.values()
+                         if term_info.get('namespace')})
+    namespace_index = {namespace: code for code, namespace in enumerate(namespaces)}
+    namespace_codes = np.full(len(term_ids), -1, dtype=np.int16)
+    names = []
+    for index, term_id in enumerate(term_ids):
+        term_info = ontology_hash.get(term_id, {})
+        names.append(term_info.get('name') or '')
+        if term_info.get('namespace'):
+            namespace_codes[index] = namespace_index[term_info['namespace']]
+
+    arrays = {'namespace_codes': namespace_codes}
+    arrays['term_id_offsets'], arrays['term_id_blob'] = _pack_strings(term_ids)
+    arrays['name_offsets'], arrays['name_blob'] = _pack_strings(names)
+    arrays['namespace_offsets'], arrays['namespace_blob'] = _pack_strings(namespaces)
+    sorted_term_ids = np.array([term_id.encode('utf-8') for term_id in term_ids],
+                               dtype=bytes)
+    arrays['sorted_term_order'] = np.argsort(sorted_term_ids, kind='mergesort').astype(np.int32)
+    arrays['sorted_term_ids'] = sorted_term_ids[arrays['sorted_term_order']]
+    for rel in RELATIONSHIP_TYPES:
+        (arrays['adjacency__{}__indptr'.format(rel)],
+         arrays['adjacency__{}__indices'.format(rel)]) = _to_csr(parent_rows[rel])
+
+    ontology = CompiledOntology(arrays)
+    for relationships in PRECOMPUTED_CLOSURES:
+        ontology.ancestor_closure(relationships)
+
+    return ontology
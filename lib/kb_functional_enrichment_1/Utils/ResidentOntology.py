@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+import traceback
+
+from kb_functional_enrichment_1.Utils.Common import log
+
+
+# seconds between reloads of a resident ontology; a reload only asks the Workspace for the
+# ontology object versions unless they changed
+ONTOLOGY_REFRESH_SECONDS = 3600
+
+
+class ResidentOntology:
+    """
+    ResidentOntology: compiled ontology kept loaded for the life of a service process and
+                      reloaded periodically by a background thread
+
+    The refresh thread is started again in a process forked from the one that started it
+    (uWSGI workers forked from the master), which keeps the ontology the master loaded.
+    """
+
+    def __init__(self, load_ontology, refresh_seconds=ONTOLOGY_REFRESH_SECONDS):
+        """
+        load_ontology: function returning the current CompiledOntology
+        refresh_seconds: seconds between reloads
+        """
+        self.load_ontology = load_ontology
+        self.refresh_seconds = refresh_seconds
+        self.ontology = None
+        self.loaded_at = None
+        self._first_load = threading.Event()
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def _refresh(self):
+        """
+        _refresh: reload the ontology, keeping the loaded one when loading fails
+        """
+        try:
+            self.ontology = self.load_ontology()
+            self.loaded_at = time.time()
+            log('resident ontology loaded')
+        except Exception:
+            log('failed to load resident ontology:\n{}'.format(traceback.format_exc()))
+        finally:
+            self._first_load.set()
+
+    def _run(self):
+        if self.loaded_at is not None:
+            # loaded by the process this one was forked from
+            time.sleep(max(0, self.loaded_at + self.refresh_seconds - time.time()))
+        while True:
+            self._refresh()
+            time.sleep(self.refresh_seconds)
+
+    def start(self):
+        """
+        start: start the refresh thread of the current process, if not running yet
+
+        the first load starts right away unless the ontology was loaded before a fork
+        """
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='resident-ontology', daemon=True).start()
+
+    def get(self, timeout=None):
+        """
+        get: the resident ontology, None if it could not be loaded
+
+        waits up to timeout seconds (forever when None) for the first load to finish
+        """
+        self.start()
+        self._first_load.wait(timeout)
+
+        return self.ontology
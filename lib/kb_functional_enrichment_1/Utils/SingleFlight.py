@@ -0,0 +1,74 @@
+import fcntl
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+
+from kb_functional_enrichment_1.Utils.Common import mkdir_p
+
+
+class SingleFlight:
+    """
+    SingleFlight: coalesce concurrent calls for the same key into one call
+
+    Threads calling do with a key that is already being computed wait for and share the
+    result (or exception) of the running call. With a lock_dir, the call also holds an
+    exclusive file lock for the key, so processes sharing lock_dir (uWSGI workers, job
+    daemon children) run it one at a time and later ones find what the first one cached.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _call(self, key, function, lock_dir):
+        if lock_dir is None:
+            return function()
+
+        mkdir_p(lock_dir)
+        lock_path = os.path.join(lock_dir,
+                                 hashlib.sha256(key.encode('utf-8')).hexdigest() + '.lock')
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return function()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def do(self, key, function, lock_dir=None):
+        """
+        do: return function(), sharing the call with concurrent callers of the same key
+
+        key: string identifying the result of function
+        function: function without arguments
+        lock_dir: optional directory of the file locks coordinating processes
+        """
+        if self._pid != os.getpid():
+            # calls in flight in the parent process have no thread running them here
+            self._reset()
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._call(key, function, lock_dir)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,118 @@
+import json
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+from installed_clients.baseclient import transferred_bytes
+
+from kb_functional_enrichment_1.Utils.Common import log
+
+
+# CPU time of the calling thread where the platform can tell it apart from the process
+_RUSAGE_THREAD = getattr(resource, 'RUSAGE_THREAD', resource.RUSAGE_SELF)
+
+_PAGE_SIZE = resource.getpagesize()
+
+
+def _cpu_time():
+    thread_usage = resource.getrusage(_RUSAGE_THREAD)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (thread_usage.ru_utime + thread_usage.ru_stime +
+            children_usage.ru_utime + children_usage.ru_stime)
+
+
+def _rss():
+    # current resident set size, None where /proc is not available
+    try:
+        with open('/proc/self/statm') as statm_file:
+            return int(statm_file.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _peak_rss():
+    # ru_maxrss is the process high-water mark in kilobytes on Linux, so in a long lived
+    # process it may have been reached by an earlier run
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class StageTimer:
+    """
+    StageTimer: wall time, CPU time, RSS and service bytes of the stages of one run
+
+    cpu_time counts the thread running the stage plus processes forked and reaped during
+    the stage, bytes_sent and bytes_received count service client traffic of that thread.
+    rss is the resident memory at the end of the stage, peak_rss the process high-water
+    mark so far, which in a long lived process is not specific to this run.
+    A stage entered again, possibly from several threads, adds up into the same record.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        stage: record the enclosed block as stage name
+        """
+        start = time.time()
+        start_cpu = _cpu_time()
+        start_sent, start_received = transferred_bytes()
+        try:
+            yield
+        finally:
+            end = time.time()
+            sent, received = transferred_bytes()
+            usage = {'wall_time': end - start,
+                     'cpu_time': _cpu_time() - start_cpu,
+                     'bytes_sent': sent - start_sent,
+                     'bytes_received': received - start_received}
+            with self._lock:
+                record = self.stages.get(name)
+                if record is None:
+                    record = {'stage': name, 'started_at': start - self.start,
+                              'wall_time': 0.0, 'cpu_time': 0.0,
+                              'bytes_sent': 0, 'bytes_received': 0, '_end': end}
+                    self.stages[name] = record
+                for key, value in usage.items():
+                    record[key] += value
+                record['started_at'] = min(record['started_at'], start - self.start)
+                record['_end'] = max(record['_end'], end)
+                # wall time of a stage run in several threads at once is the time it spans
+                record['wall_time'] = min(record['wall_time'],
+                                          record['_end'] - self.start - record['started_at'])
+                record['rss'] = _rss()
+                record['peak_rss'] = _peak_rss()
+
+    def stage_timings(self):
+        """
+        stage_timings: stage records in start order
+        """
+        with self._lock:
+            records = sorted(self.stages.values(), key=lambda record: record['started_at'])
+            return [{key: value for key, value in record.items() if not key.startswith('_')}
+                    for record in records]
+
+    def log_stages(self):
+        """
+        log_stages: log stages in start order, overlapping stages ran concurrently
+        """
+        for record in self.stage_timings():
+            rss_mb = record['rss'] / 1024 ** 2 if record['rss'] is not None else float('nan')
+            log('stage {stage}: started at {started_at:.2f} s, took {wall_time:.2f} s '
+                '(cpu {cpu_time:.2f} s, rss {rss_mb:.0f} MB, '
+                'process peak rss so far {peak_rss_mb:.0f} MB, '
+                'sent {bytes_sent} B, received {bytes_received} B)'.format(
+                    rss_mb=rss_mb, peak_rss_mb=record['peak_rss'] / 1024 ** 2, **record))
+        log('total: {:.2f} s'.format(time.time() - self.start))
+
+    def save(self, file_path):
+        """
+        save: write stage records and total wall time as JSON
+        """
+        with open(file_path, 'w') as timing_file:
+            json.dump({'total_wall_time': time.time() - self.start,
+                       'stages': self.stage_timings()}, timing_file, indent=1)
@@ -2,8 +2,10 @@
 #BEGIN_HEADER
 import os
 import json
+import sys
 
-from kb_functional_enrichment_1.Utils.FunctionalEnrichmentUtil import FunctionalEnrichmentUtil
+# FunctionalEnrichmentUtil pulls in numpy, scipy and the service clients, it is imported
+# by the methods that need it so status and server startup don't pay for those imports
 #END_HEADER
 
 
@@ -27,6 +29,49 @@ class kb_functional_enrichment_1:
     GIT_COMMIT_HASH = "d0bbb06c6ef161631f54f9c71cfad75e24632279"
 
     #BEGIN_CLASS_HEADER
+    def start_resident_ontology(self):
+        """
+        start_resident_ontology: keep the compiled ontology loaded and refreshed in the
+                                 background for the life of the process, when
+                                 resident-ontology is enabled in the config
+        """
+        if str(self.config.get('resident-ontology', '')).lower() != 'true':
+            return
+
+        from kb_functional_enrichment_1.Utils.ResidentOntology import (
+            ONTOLOGY_REFRESH_SECONDS, ResidentOntology)
+
+        def load_ontology():
+            from kb_functional_enrichment_1.Utils.FunctionalEnrichmentUtil import \
+                FunctionalEnrichmentUtil
+            return FunctionalEnrichmentUtil(self.config).ontology_cache.get_compiled_ontology()
+
+        if self.resident_ontology is None:
+            self.resident_ontology = ResidentOntology(
+                load_ontology,
+                float(self.config.get('ontology-refresh-seconds', ONTOLOGY_REFRESH_SECONDS)))
+        self.resident_ontology.start()
+
+    def _get_resident_ontology(self):
+        """
+        _get_resident_ontology: resident ontology of a long lived uWSGI service process,
+                                started by the first method call; None in one-shot async
+                                jobs unless preload started it
+        """
+        if 'uwsgi' in sys.modules:
+            self.start_resident_ontology()
+        return self.resident_ontology
+
+    def preload(self):
+        """
+        preload: import the enrichment code and load the ontology ahead of the first job, for
+                 long lived processes running many jobs
+        """
+        from kb_functional_enrichment_1.Utils.FunctionalEnrichmentUtil import \
+            FunctionalEnrichmentUtil  # noqa: F401
+        self.start_resident_ontology()
+        if self.resident_ontology is not None:
+            self.resident_ontology.get()
     #END_CLASS_HEADER
 
     # config contains contents of config file in a hash or None if it couldn't
@@ -36,6 +81,8 @@ class kb_functional_enrichment_1:
         self.config = config
         self.config['SDK_CALLBACK_URL'] = os.environ['SDK_CALLBACK_URL']
         self.config['KB_AUTH_TOKEN'] = os.environ['KB_AUTH_TOKEN']
+        # started on first use in long lived service processes only
+        self.resident_ontology = None
         #END_CONSTRUCTOR
         pass
 
@@ -64,9 +111,25 @@ class kb_functional_enrichment_1:
         :returns: instance of type "FEOneResult" (result_directory: folder
            path that holds all files generated by run_deseq2_app report_name:
            report name generated by KBaseReport report_ref: report reference
-           generated by KBaseReport) -> structure: parameter
-           "result_directory" of String, parameter "report_name" of String,
-           parameter "report_ref" of String
+           generated by KBaseReport stage_timings: per stage resource usage,
+           also written to stage_timings.json in result_directory) ->
+           structure: parameter "result_directory" of String, parameter
+           "report_name" of String, parameter "report_ref" of String,
+           parameter "stage_timings" of list of type "StageTiming" (stage:
+           run stage, one of feature_set_load, genome_load, ontology_load,
+           propagation, statistics, fdr, file_writing, html, shock_upload,
+           report_creation started_at: seconds from the start of the run
+           wall_time: seconds spent in the stage cpu_time: CPU seconds spent
+           in the stage rss: resident memory of the process in bytes at the
+           end of the stage peak_rss: highest resident memory of the process
+           in bytes so far, at the end of the stage; in a long lived process
+           it may have been reached by an earlier run bytes_sent: bytes sent
+           to KBase services during the stage bytes_received: bytes received
+           from KBase services during the stage) -> structure: parameter
+           "stage" of String, parameter "started_at" of Double, parameter
+           "wall_time" of Double, parameter "cpu_time" of Double, parameter
+           "rss" of Long, parameter "peak_rss" of Long, parameter
+           "bytes_sent" of Long, parameter "bytes_received" of Long
         """
         # ctx is the context object
         # return variables are: returnVal
@@ -78,7 +141,10 @@ class kb_functional_enrichment_1:
             if isinstance(value, str):
                 params[key] = value.strip()
 
-        fe1_runner = FunctionalEnrichmentUtil(self.config)
+        from kb_functional_enrichment_1.Utils.FunctionalEnrichmentUtil import \
+            FunctionalEnrichmentUtil
+        fe1_runner = FunctionalEnrichmentUtil(self.config,
+                                              resident_ontology=self._get_resident_ontology())
         returnVal = fe1_runner.run_fe1(params)
         #END run_fe1
 
@@ -88,6 +154,79 @@ class kb_functional_enrichment_1:
                              'returnVal is not type dict as required.')
         # return the results
         return [returnVal]
+
+    def run_fe1_batch(self, ctx, params):
+        """
+        run_fe1_batch: run functional enrichment one on multiple FeatureSets of one Genome
+                       and generate a single combined report
+        :param params: instance of type "FEOneBatchInput" (required params:
+           feature_set_refs: FeatureSet object references, all FeatureSets
+           must reference the same Genome workspace_name: the name of the
+           workspace it gets saved to optional params: propagation: includes
+           is_a relationship to all go terms (default is 1)
+           filter_ref_features: filter reference genome features with no go
+           terms (default is 0) statistical_significance: parameter for
+           statistical significance. Select one from left_tailed,
+           right_tailed or two_tailed (default is left_tailed)
+           ignore_go_term_not_in_feature_set: ignore Go term analysis if term
+           is not associated with FeatureSet (default is 1)) -> structure:
+           parameter "feature_set_refs" of list of type "obj_ref" (An X/Y/Z
+           style reference), parameter "workspace_name" of String, parameter
+           "propagation" of type "boolean" (A boolean - 0 for false, 1 for
+           true. @range (0, 1)), parameter "filter_ref_features" of type
+           "boolean" (A boolean - 0 for false, 1 for true. @range (0, 1)),
+           parameter "statistical_significance" of String, parameter
+           "ignore_go_term_not_in_feature_set" of type "boolean" (A boolean -
+           0 for false, 1 for true. @range (0, 1))
+        :returns: instance of type "FEOneResult" (result_directory: folder
+           path that holds all files generated by run_deseq2_app report_name:
+           report name generated by KBaseReport report_ref: report reference
+           generated by KBaseReport stage_timings: per stage resource usage,
+           also written to stage_timings.json in result_directory) ->
+           structure: parameter "result_directory" of String, parameter
+           "report_name" of String, parameter "report_ref" of String,
+           parameter "stage_timings" of list of type "StageTiming" (stage:
+           run stage, one of feature_set_load, genome_load, ontology_load,
+           propagation, statistics, fdr, file_writing, html, shock_upload,
+           report_creation started_at: seconds from the start of the run
+           wall_time: seconds spent in the stage cpu_time: CPU seconds spent
+           in the stage rss: resident memory of the process in bytes at the
+           end of the stage peak_rss: highest resident memory of the process
+           in bytes so far, at the end of the stage; in a long lived process
+           it may have been reached by an earlier run bytes_sent: bytes sent
+           to KBase services during the stage bytes_received: bytes received
+           from KBase services during the stage) -> structure: parameter
+           "stage" of String, parameter "started_at" of Double, parameter
+           "wall_time" of Double, parameter "cpu_time" of Double, parameter
+           "rss" of Long, parameter "peak_rss" of Long, parameter
+           "bytes_sent" of Long, parameter "bytes_received" of Long
+        """
+        # ctx is the context object
+        # return variables are: returnVal
+        #BEGIN run_fe1_batch
+        print('--->\nRunning kb_functional_enrichment_1.run_fe1_batch\nparams:')
+        print(json.dumps(params, indent=1))
+
+        for key, value in params.items():
+            if isinstance(value, str):
+                params[key] = value.strip()
+        if isinstance(params.get('feature_set_refs'), list):
+            params['feature_set_refs'] = [ref.strip() if isinstance(ref, str) else ref
+                                          for ref in params['feature_set_refs']]
+
+        from kb_functional_enrichment_1.Utils.FunctionalEnrichmentUtil import \
+            FunctionalEnrichmentUtil
+        fe1_runner = FunctionalEnrichmentUtil(self.config,
+                                              resident_ontology=self._get_resident_ontology())
+        returnVal = fe1_runner.run_fe1_batch(params)
+        #END run_fe1_batch
+
+        # At some point might do deeper type checking...
+        if not isinstance(returnVal, dict):
+            raise ValueError('Method run_fe1_batch return value ' +
+                             'returnVal is not type dict as required.')
+        # return the results
+        return [returnVal]
     def status(self, ctx):
         #BEGIN_STATUS
         returnVal = {'state': "OK",
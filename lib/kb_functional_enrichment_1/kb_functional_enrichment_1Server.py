@@ -342,6 +342,10 @@ class Application(object):
                              name='kb_functional_enrichment_1.run_fe1',
                              types=[dict])
         self.method_authentication['kb_functional_enrichment_1.run_fe1'] = 'required'  # noqa
+        self.rpc_service.add(impl_kb_functional_enrichment_1.run_fe1_batch,
+                             name='kb_functional_enrichment_1.run_fe1_batch',
+                             types=[dict])
+        self.method_authentication['kb_functional_enrichment_1.run_fe1_batch'] = 'required'  # noqa
         self.rpc_service.add(impl_kb_functional_enrichment_1.status,
                              name='kb_functional_enrichment_1.status',
                              types=[dict])
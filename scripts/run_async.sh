@@ -2,7 +2,9 @@ script_dir=$(dirname "$(readlink -f "$0")")
 export KB_DEPLOYMENT_CONFIG=$script_dir/../deploy.cfg
 WD=/kb/module/work
 if [ -f $WD/token ]; then
-    cat $WD/token | xargs sh $script_dir/../bin/run_kb_functional_enrichment_1_async_job.sh $WD/input.json $WD/output.json
+    # runs the job on the job daemon when one is configured and running, in process otherwise
+    export PYTHONPATH=$script_dir/../lib:$PYTHONPATH
+    cat $WD/token | xargs python -u -m kb_functional_enrichment_1.Utils.JobDaemon $WD/input.json $WD/output.json
 else
     echo "File $WD/token doesn't exist, aborting."
     exit 1
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from installed_clients import baseclient
+from installed_clients.baseclient import BaseClient
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _RPCHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        request = json.loads(body.decode('utf-8'))
+        self.server.requests.append(request['method'])
+
+        if self.server.failures:
+            self.server.failures -= 1
+            status, response = 503, b'unavailable'
+        elif self.server.no_result:
+            status, response = 200, json.dumps({'version': '1.1'}).encode('utf-8')
+        else:
+            status = 200
+            response = json.dumps({'result': request['params']}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+class BaseClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), _RPCHandler)
+        self.server.connections = 0
+        self.server.requests = []
+        self.server.failures = 0
+        self.server.no_result = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        baseclient.configure_session(pool_maxsize=4)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        baseclient.configure_session()
+
+    def test_keep_alive(self):
+        client = BaseClient(self.url, token='token')
+        other_client = BaseClient(self.url, token='token')
+        sent, received = baseclient.transferred_bytes()
+        for i in range(3):
+            self.assertEqual(i, client.call_method('Service.get_thing', [i]))
+            self.assertEqual(i, other_client.call_method('Service.get_thing', [i]))
+
+        self.assertEqual(1, self.server.connections)
+        # every response body is {"result": [i]}, 15 bytes
+        self.assertEqual(received + 6 * 15, baseclient.transferred_bytes()[1])
+        self.assertLess(sent, baseclient.transferred_bytes()[0])
+
+    def test_retry_idempotent_calls(self):
+        client = BaseClient(self.url, token='token', retry_backoff_s=0.01)
+
+        self.server.failures = 2
+        self.assertEqual(1, client.call_method('Service.get_objects2', [1]))
+        self.assertEqual(3, len(self.server.requests))
+
+        self.server.failures = 1
+        with self.assertRaises(Exception):
+            client.call_method('Service.save_objects', [1])
+        self.assertEqual(4, len(self.server.requests))
+
+        self.server.failures = 4
+        with self.assertRaises(Exception):
+            client.call_method('Service.get_objects2', [1])
+        self.assertEqual(8, len(self.server.requests))
+
+    def test_gzip_request(self):
+        client = BaseClient(self.url, token='token', gzip_request_min_bytes=100)
+
+        params = [{'feature_ids': ['feature_{}'.format(i) for i in range(100)]}]
+        self.assertEqual(params[0], client.call_method('Service.get_features', params))
+        self.assertEqual('x', client.call_method('Service.get_features', ['x']))
+
+    def test_idempotent_methods(self):
+        self.assertFalse(baseclient._is_idempotent('Workspace.save_objects'))
+        self.assertFalse(baseclient._is_idempotent('KBaseReport.create_extended_report'))
+        self.assertTrue(baseclient._is_idempotent('Workspace.get_object_info3'))
+        self.assertTrue(baseclient._is_idempotent('GenomeSearchUtil.search'))
+
+    def test_call_method_stream(self):
+        client = BaseClient(self.url, token='token')
+        genome = {'data': [{'data': {'ontologies_present': {'GO': {'GO:1': 'term'}},
+                                     'features': [{'id': 'a', 'score': 1.5},
+                                                  {'id': 'b', 'ontology_terms': {}}],
+                                     'term_hash': {'GO:1': {'name': 'x'},
+                                                   'GO:2': {'name': 'y', 'is_a': []}}}}]}
+        prefixes = ['data.item.data.features.item', 'data.item.data.term_hash.*',
+                    'data.item.data.ontologies_present']
+        expected = [('data.item.data.ontologies_present', {'GO': {'GO:1': 'term'}}),
+                    ('data.item.data.features.item', {'id': 'a', 'score': 1.5}),
+                    ('data.item.data.features.item', {'id': 'b', 'ontology_terms': {}}),
+                    ('data.item.data.term_hash.*', ('GO:1', {'name': 'x'})),
+                    ('data.item.data.term_hash.*', ('GO:2', {'name': 'y', 'is_a': []}))]
+
+        ijson = baseclient._ijson
+        try:
+            for streaming in [True, False]:
+                if not streaming:
+                    baseclient._ijson = None
+                elif ijson is None:
+                    continue
+                items = list(client.call_method_stream('Workspace.get_objects2', [genome],
+                                                       prefixes))
+                self.assertEqual(sorted(expected, key=repr), sorted(items, key=repr))
+                if streaming:
+                    self.assertEqual(expected, items)
+        finally:
+            baseclient._ijson = ijson
+
+    def test_call_method_stream_without_result(self):
+        client = BaseClient(self.url, token='token')
+        self.server.no_result = True
+
+        ijson = baseclient._ijson
+        try:
+            for streaming in [True, False]:
+                if not streaming:
+                    baseclient._ijson = None
+                elif ijson is None:
+                    continue
+                with self.assertRaisesRegex(baseclient.ServerError, 'unknown server error'):
+                    list(client.call_method_stream('Workspace.get_objects2', [{}],
+                                                   ['data.item.data.term_hash.*']))
+        finally:
+            baseclient._ijson = ijson
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+In-process stand-ins for the services run_fe1 talks to
+
+objects are kept as JSON text and decoded on every get_objects2 call, so the client side
+decoding cost of a real Workspace response is part of the measurements
+"""
+import json
+import os
+import uuid
+
+
+def _copy_included_path(source, target, path):
+    key, rest = path[0], path[1:]
+    if not isinstance(source, dict) or key not in source:
+        return
+    if not rest:
+        target[key] = source[key]
+    elif rest[0] == '[*]':
+        items = target.setdefault(key, [{} for _ in source[key]])
+        for source_item, target_item in zip(source[key], items):
+            if rest[1:]:
+                _copy_included_path(source_item, target_item, rest[1:])
+    else:
+        _copy_included_path(source[key], target.setdefault(key, {}), rest)
+
+
+def _apply_included(data, included):
+    """
+    _apply_included: subset of data selected by Workspace included paths
+    """
+    selected = {}
+    for path in included:
+        _copy_included_path(data, selected, path.strip('/').split('/'))
+    return selected
+
+
+class FakeWorkspace:
+
+    def __init__(self):
+        self.objects = {}
+        self.names = {}
+        self.object_counts = {}
+        self.calls = []
+
+    def save_object(self, workspace_id, workspace_name, name, object_type, data):
+        """
+        save_object: store object and return its wsid/objid/version reference
+        """
+        object_id = self.object_counts.get(workspace_id, 0) + 1
+        self.object_counts[workspace_id] = object_id
+        upa = '{}/{}/1'.format(workspace_id, object_id)
+        info = [object_id, name, object_type, '2020-01-01T00:00:00+0000', 1, 'bench',
+                workspace_id, workspace_name, 'chsum', 0, {}]
+        text = json.dumps(data)
+        info[9] = len(text)
+        self.objects[upa] = (info, text)
+        for alias in [upa, '{}/{}'.format(workspace_id, object_id),
+                      '{}/{}'.format(workspace_name, name)]:
+            self.names[alias] = upa
+
+        return upa
+
+    def _resolve(self, object_identity):
+        if 'ref' in object_identity:
+            ref = object_identity['ref'].split(';')[-1]
+        else:
+            ref = '{}/{}'.format(object_identity['workspace'], object_identity['name'])
+        return self.names[ref]
+
+    def get_object_info3(self, params):
+        self.calls.append('get_object_info3')
+        upas = [self._resolve(object_identity) for object_identity in params['objects']]
+        return {'infos': [list(self.objects[upa][0]) for upa in upas],
+                'paths': [[upa] for upa in upas]}
+
+    def get_objects2(self, params):
+        self.calls.append('get_objects2')
+        data = []
+        for object_identity in params['objects']:
+            info, text = self.objects[self._resolve(object_identity)]
+            object_data = json.loads(text)
+            if object_identity.get('included'):
+                object_data = _apply_included(object_data, object_identity['included'])
+            data.append({'data': object_data, 'info': list(info)})
+        return {'data': data}
+
+
+class FakeGenomeSearchUtil:
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.rows = {}
+
+    def _genome_rows(self, ref):
+        upa = self.workspace._resolve({'ref': ref})
+        if upa not in self.rows:
+            genome = self.workspace.get_objects2({'objects': [{'ref': upa}]})['data'][0]['data']
+            rows = []
+            for feature_array, default_type in [('features', 'gene'), ('cdss', 'CDS'),
+                                                ('mrnas', 'mRNA'),
+                                                ('non_coding_features', 'non_coding_feature')]:
+                for feature in genome.get(feature_array) or []:
+                    ontology_terms = {}
+                    for terms in (feature.get('ontology_terms') or {}).values():
+                        for term_id, term_info in terms.items():
+                            ontology_terms[term_id] = term_info.get('term_name')
+                    rows.append({'feature_id': feature['id'],
+                                 'feature_type': feature.get('type') or default_type,
+                                 'function': feature.get('function'),
+                                 'ontology_terms': ontology_terms})
+            rows.sort(key=lambda row: row['feature_id'])
+            self.rows[upa] = rows
+        return self.rows[upa]
+
+    def search(self, params):
+        rows = self._genome_rows(params['ref'])
+        start = params.get('start', 0)
+        limit = params.get('limit', 10)
+        # rows go through JSON like a real service response
+        return json.loads(json.dumps({'num_found': len(rows), 'start': start,
+                                      'features': rows[start:start + limit]}))
+
+
+class FakeDataFileUtil:
+
+    def __init__(self):
+        self.uploaded_bytes = 0
+
+    def file_to_shock(self, params):
+        for directory, _, file_names in os.walk(params['file_path']):
+            for file_name in file_names:
+                self.uploaded_bytes += os.path.getsize(os.path.join(directory, file_name))
+        return {'shock_id': str(uuid.uuid4())}
+
+
+class FakeKBaseReport:
+
+    def __init__(self):
+        self.reports = []
+
+    def create_extended_report(self, params):
+        self.reports.append(params)
+        return {'name': params['report_object_name'], 'ref': '1/{}/1'.format(len(self.reports))}
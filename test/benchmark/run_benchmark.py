@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Offline run_fe1 benchmark on synthetic genomes, no KBase services needed
+
+every scale runs in its own interpreter so peak RSS is per scale; the first run of a scale
+starts with empty ontology and annotation caches (cold), the following runs reuse them (warm)
+
+usage: python test/benchmark/run_benchmark.py [--features 5000,50000,200000]
+                                              [--genome-loader workspace] [--runs 2]
+                                              [--output benchmark.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..', '..', 'lib'))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..'))
+
+from benchmark.fakes import (FakeDataFileUtil, FakeGenomeSearchUtil,  # noqa: E402
+                             FakeKBaseReport, FakeWorkspace)
+from benchmark.synthetic import (DEFAULT_TERM_COUNT, make_feature_set,  # noqa: E402
+                                 make_genome, make_term_hash)
+
+SCALES = [5000, 50000, 200000]
+FEATURE_SET_SIZE = 200
+
+
+def build_workspace(feature_count, term_count=DEFAULT_TERM_COUNT, seed=0):
+    """
+    build_workspace: FakeWorkspace holding the ontologies, a synthetic genome and a FeatureSet
+
+    return:
+    workspace: FakeWorkspace
+    feature_set_ref: FeatureSet reference
+    """
+    workspace = FakeWorkspace()
+    term_hash = make_term_hash(term_count, seed)
+    workspace.save_object(6, 'KBaseOntology', 'gene_ontology',
+                          'KBaseOntology.OntologyDictionary',
+                          {'ontology': 'gene_ontology', 'term_hash': term_hash})
+    workspace.save_object(6, 'KBaseOntology', 'plant_ontology',
+                          'KBaseOntology.OntologyDictionary',
+                          {'ontology': 'plant_ontology', 'term_hash': {}})
+
+    genome = make_genome(feature_count, term_hash, seed)
+    genome_ref = workspace.save_object(10, 'benchmark', 'genome', 'KBaseGenomes.Genome', genome)
+    feature_set = make_feature_set(genome, genome_ref, min(FEATURE_SET_SIZE, feature_count),
+                                   seed)
+    feature_set_ref = workspace.save_object(10, 'benchmark', 'feature_set',
+                                            'KBaseCollections.FeatureSet', feature_set)
+
+    return workspace, feature_set_ref
+
+
+def make_fe_util(scratch, workspace, config=None):
+    """
+    make_fe_util: FunctionalEnrichmentUtil talking to in-process fake services
+    """
+    from kb_functional_enrichment_1.Utils.FunctionalEnrichmentUtil import \
+        FunctionalEnrichmentUtil
+
+    fe_config = {'workspace-url': 'http://localhost/ws',
+                 'SDK_CALLBACK_URL': 'http://localhost/callback',
+                 'KB_AUTH_TOKEN': 'token',
+                 'shock-url': 'http://localhost/shock',
+                 'scratch': scratch,
+                 # warm runs measure the pipeline with warm caches, not a cached result
+                 'result-cache-max-bytes': '0'}
+    fe_config.update(config or {})
+
+    fe_util = FunctionalEnrichmentUtil(fe_config)
+    fe_util.ws = workspace
+    fe_util.ontology_cache.ws = workspace
+    fe_util.gsu = FakeGenomeSearchUtil(workspace)
+    fe_util.dfu = FakeDataFileUtil()
+    fe_util.kbase_report = FakeKBaseReport()
+
+    return fe_util
+
+
+def run_scale(feature_count, term_count=DEFAULT_TERM_COUNT, runs=2, config=None, params=None,
+              seed=0):
+    """
+    run_scale: run run_fe1 runs times against a synthetic genome of feature_count features
+
+    return:
+    dict with the scale and the stage timings and total wall time of every run
+    """
+    workspace, feature_set_ref = build_workspace(feature_count, term_count, seed)
+    run_params = {'feature_set_ref': feature_set_ref, 'workspace_name': 'benchmark'}
+    run_params.update(params or {})
+
+    scratch = tempfile.mkdtemp()
+    try:
+        run_results = []
+        for run in range(runs):
+            fe_util = make_fe_util(scratch, workspace, config)
+            result = fe_util.run_fe1(dict(run_params))
+            with open(os.path.join(result['result_directory'], 'stage_timings.json')) as f:
+                timings = json.load(f)
+            run_results.append({'run': 'cold' if run == 0 else 'warm',
+                                'total_wall_time': timings['total_wall_time'],
+                                'stage_timings': timings['stages'],
+                                'result_directory_files': sorted(
+                                    os.listdir(result['result_directory']))})
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {'features': feature_count, 'terms': term_count, 'config': config or {},
+            'runs': run_results}
+
+
+def _format_table(scale_results):
+    lines = []
+    for scale_result in scale_results:
+        lines.append('{} features, {} terms'.format(scale_result['features'],
+                                                   scale_result['terms']))
+        lines.append('  {:<18}{:>14}{:>14}{:>14}'.format('stage', 'wall s', 'cpu s',
+                                                       'peak rss MB'))
+        for run_result in scale_result['runs']:
+            lines.append('  {} run, total {:.2f} s'.format(run_result['run'],
+                                                          run_result['total_wall_time']))
+            for stage in run_result['stage_timings']:
+                lines.append('  {:<18}{:>14.3f}{:>14.3f}{:>14.0f}'.format(
+                    stage['stage'], stage['wall_time'], stage['cpu_time'],
+                    stage['peak_rss'] / 1024 ** 2))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='offline run_fe1 benchmark')
+    parser.add_argument('--features', default=','.join(str(scale) for scale in SCALES),
+                        help='comma separated genome sizes')
+    parser.add_argument('--terms', type=int, default=DEFAULT_TERM_COUNT)
+    parser.add_argument('--runs', type=int, default=2)
+    parser.add_argument('--genome-loader', default='workspace')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--single', action='store_true',
+                        help='run the only given scale in process and print JSON')
+    args = parser.parse_args(argv)
+
+    scales = [int(scale) for scale in args.features.split(',')]
+    config = {'genome-loader': args.genome_loader}
+
+    if args.single:
+        # run_fe1 logs to stdout, keep stdout for the JSON result
+        with contextlib.redirect_stdout(sys.stderr):
+            scale_result = run_scale(scales[0], args.terms, args.runs, config)
+        print(json.dumps(scale_result))
+        return
+
+    scale_results = []
+    for scale in scales:
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--single', '--features', str(scale),
+             '--terms', str(args.terms), '--runs', str(args.runs),
+             '--genome-loader', args.genome_loader], stderr=subprocess.DEVNULL)
+        scale_results.append(json.loads(output.decode('utf-8').strip().splitlines()[-1]))
+
+    print(_format_table(scale_results))
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(scale_results, output_file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Seeded generators of GO-like ontologies, genomes and FeatureSets for the benchmarks
+"""
+import hashlib
+import random
+
+NAMESPACES = ['biological_process', 'molecular_function', 'cellular_component']
+
+# size of the synthetic ontology, close to the number of terms in GO
+DEFAULT_TERM_COUNT = 45000
+
+# depth of the synthetic ontology, GO terms are at most about fifteen is_a steps from a root
+TERM_LEVELS = 14
+
+
+def make_term_hash(term_count=DEFAULT_TERM_COUNT, seed=0):
+    """
+    make_term_hash: KBaseOntology.OntologyDictionary term_hash of a GO-like DAG
+
+    the first term of every namespace is its root, every other term sits on one of
+    TERM_LEVELS levels whose sizes grow geometrically and has one to three is_a parents,
+    mostly on the level right above it; some terms also have a part_of or regulates
+    relationship to a shallower term, which gives GO's shallow but wide shape with a few
+    dozen ancestors per term
+    """
+    rng = random.Random(seed)
+    level_weights = [1.6 ** level for level in range(1, TERM_LEVELS)]
+    levels = {namespace: [[] for _ in range(TERM_LEVELS)] for namespace in NAMESPACES}
+    term_hash = {}
+    for index in range(term_count):
+        term_id = 'GO:{:07d}'.format(index)
+        namespace = NAMESPACES[index % len(NAMESPACES)]
+        namespace_levels = levels[namespace]
+        term = {'id': term_id,
+                'name': 'synthetic {} term {}'.format(namespace, index),
+                'namespace': namespace,
+                'def': ['"Synthetic term {} for benchmarking." [GOC:bench]'.format(index)],
+                'synonym': ['"synthetic {}" EXACT []'.format(index)],
+                'xref': ['BENCH:{}'.format(index)]}
+
+        if namespace_levels[0]:
+            level = rng.choices(range(1, TERM_LEVELS), level_weights)[0]
+            while not namespace_levels[level - 1]:
+                level -= 1
+
+            parents = set()
+            for _ in range(rng.choice([1, 1, 1, 2, 2, 3])):
+                if level > 1 and rng.random() < 0.3:
+                    parent_level = rng.randrange(level - 1)
+                else:
+                    parent_level = level - 1
+                parents.add(rng.choice(namespace_levels[parent_level]))
+            term['is_a'] = ['{} ! synthetic term'.format(parent) for parent in sorted(parents)]
+
+            if level > 1 and rng.random() < 0.15:
+                relationship = rng.choice(['part_of', 'regulates'])
+                target = rng.choice(namespace_levels[rng.randrange(1, level)])
+                term['relationship'] = ['{} {} ! synthetic term'.format(relationship, target)]
+        else:
+            level = 0
+
+        namespace_levels[level].append(term_id)
+        term_hash[term_id] = term
+
+    return term_hash
+
+
+def make_genome(feature_count, term_hash, seed=0, annotated_fraction=0.7, max_terms=6):
+    """
+    make_genome: KBaseGenomes.Genome with feature_count features
+
+    annotated_fraction of the features carry one to max_terms GO terms, drawn with a bias
+    towards specific (late) terms as in real annotations; features also carry the
+    location, sequence and alias fields the loaders have to skip
+    """
+    rng = random.Random(seed)
+    term_ids = sorted(term_hash)
+    features = []
+    for index in range(feature_count):
+        feature_id = 'bench_{:07d}'.format(index)
+        sequence_length = rng.randint(100, 3000)
+        feature = {'id': feature_id,
+                   'type': 'gene',
+                   'function': 'synthetic protein {}'.format(index % 997),
+                   'location': [['contig_1', index * 3000 + 1, '+', sequence_length]],
+                   'dna_sequence_length': sequence_length,
+                   'md5': hashlib.md5(feature_id.encode('utf-8')).hexdigest(),
+                   'aliases': [['locus_tag', 'BENCH_{}'.format(index)]],
+                   'ontology_terms': {}}
+
+        if rng.random() < annotated_fraction:
+            go_terms = {}
+            for _ in range(rng.randint(1, max_terms)):
+                term_id = term_ids[int(len(term_ids) * (1 - rng.random() ** 2))]
+                go_terms[term_id] = {'id': term_id,
+                                     'term_name': term_hash[term_id]['name'],
+                                     'ontology_ref': 'KBaseOntology/gene_ontology',
+                                     'evidence': [],
+                                     'term_lineage': []}
+            feature['ontology_terms'] = {'GO': go_terms}
+
+        features.append(feature)
+
+    return {'id': 'bench_genome_{}'.format(feature_count),
+            'scientific_name': 'Synthetic benchmark genome',
+            'domain': 'Bacteria',
+            'features': features,
+            'cdss': [],
+            'mrnas': [],
+            'non_coding_features': []}
+
+
+def make_feature_set(genome, genome_ref, size, seed=0):
+    """
+    make_feature_set: KBaseCollections.FeatureSet of size random features of genome
+    """
+    rng = random.Random(seed)
+    feature_ids = sorted(rng.sample([feature['id'] for feature in genome['features']], size))
+
+    return {'description': 'synthetic benchmark FeatureSet',
+            'element_ordering': feature_ids,
+            'elements': {feature_id: [genome_ref] for feature_id in feature_ids}}
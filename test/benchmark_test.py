@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from benchmark.run_benchmark import build_workspace, run_scale
+from benchmark.synthetic import make_term_hash
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_synthetic_data_is_reproducible(self):
+        self.assertEqual(make_term_hash(300, seed=1), make_term_hash(300, seed=1))
+
+        workspace, feature_set_ref = build_workspace(200, term_count=300, seed=1)
+        other_workspace, other_feature_set_ref = build_workspace(200, term_count=300, seed=1)
+        self.assertEqual(feature_set_ref, other_feature_set_ref)
+        self.assertEqual(workspace.objects, other_workspace.objects)
+
+    def test_run_scale(self):
+        result = run_scale(500, term_count=300, runs=2, config={'worker-count': '1'})
+
+        self.assertEqual(500, result['features'])
+        self.assertEqual(['cold', 'warm'], [run['run'] for run in result['runs']])
+        for run in result['runs']:
+            stages = [stage['stage'] for stage in run['stage_timings']]
+            for stage in ['ontology_load', 'feature_set_load', 'genome_load', 'propagation',
+                          'statistics', 'fdr', 'file_writing', 'report_creation']:
+                self.assertIn(stage, stages)
+            self.assertIn('functional_enrichment.csv', run['result_directory_files'])
+            self.assertGreater(run['total_wall_time'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmark.fakes import FakeWorkspace
+from benchmark.run_benchmark import make_fe_util
+
+
+def _term(term_id, parents=()):
+    return {'id': term_id, 'name': 'term ' + term_id, 'namespace': 'biological_process',
+            'is_a': ['{} ! parent'.format(parent) for parent in parents]}
+
+
+def _feature(feature_id, go_ids):
+    go_terms = {go_id: {'id': go_id, 'evidence': [], 'term_lineage': []} for go_id in go_ids}
+    return {'id': feature_id, 'type': 'gene', 'function': '',
+            'ontology_terms': {'GO': go_terms} if go_terms else {}}
+
+
+class ContingencyTableTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workspace = FakeWorkspace()
+        term_hash = {'GO:0000001': _term('GO:0000001'),
+                     'GO:0000002': _term('GO:0000002', ['GO:0000001'])}
+        cls.workspace.save_object(6, 'KBaseOntology', 'gene_ontology',
+                                  'KBaseOntology.OntologyDictionary',
+                                  {'ontology': 'gene_ontology', 'term_hash': term_hash})
+        cls.workspace.save_object(6, 'KBaseOntology', 'plant_ontology',
+                                  'KBaseOntology.OntologyDictionary',
+                                  {'ontology': 'plant_ontology', 'term_hash': {}})
+
+        # f0-f5 carry GO terms, f6-f9 none
+        features = ([_feature('f{}'.format(index), ['GO:0000002']) for index in range(3)] +
+                    [_feature('f{}'.format(index), ['GO:0000001']) for index in range(3, 6)] +
+                    [_feature('f{}'.format(index), []) for index in range(6, 10)])
+        genome_ref = cls.workspace.save_object(
+            10, 'test', 'genome', 'KBaseGenomes.Genome',
+            {'id': 'genome', 'scientific_name': 'test genome', 'domain': 'Bacteria',
+             'features': features, 'cdss': [], 'mrnas': [], 'non_coding_features': []})
+
+        # two of the five FeatureSet features carry no GO term
+        feature_set_ids = ['f0', 'f1', 'f3', 'f6', 'f7']
+        cls.feature_set_ref = cls.workspace.save_object(
+            10, 'test', 'feature_set', 'KBaseCollections.FeatureSet',
+            {'description': 'test', 'element_ordering': feature_set_ids,
+             'elements': {feature_id: [genome_ref] for feature_id in feature_set_ids}})
+
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.scratch)
+
+    def _fisher_variables(self, filter_ref_features):
+        fe_util = make_fe_util(self.scratch, self.workspace)
+        result = fe_util.run_fe1({'feature_set_ref': self.feature_set_ref,
+                                  'workspace_name': 'test_workspace',
+                                  'filter_ref_features': filter_ref_features})
+        fisher_variables = {}
+        with open(os.path.join(result['result_directory'], 'fisher_variables.txt')) as f:
+            for line in f:
+                go_id, *values = line.split()
+                fisher_variables[go_id] = {value.split(':')[0]: int(value.split(':')[1])
+                                           for value in values[:4]}
+        return fisher_variables
+
+    def test_all_reference_features(self):
+        self.assertEqual({'GO:0000001': {'a': 3, 'b': 2, 'c': 3, 'd': 2},
+                          'GO:0000002': {'a': 2, 'b': 3, 'c': 1, 'd': 4}},
+                         self._fisher_variables(0))
+
+    def test_filter_ref_features(self):
+        # FeatureSet features without GO terms are not reference features, so they count
+        # neither in b nor in d
+        self.assertEqual({'GO:0000001': {'a': 3, 'b': 0, 'c': 3, 'd': 0},
+                          'GO:0000002': {'a': 2, 'b': 1, 'c': 1, 'd': 2}},
+                         self._fisher_variables(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
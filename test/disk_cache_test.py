@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from kb_functional_enrichment_1.Utils.DiskCache import DiskCache
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_get_put(self):
+        cache = DiskCache(os.path.join(self.cache_dir, 'cache'), 1024 ** 2)
+
+        self.assertIsNone(cache.get('1/2/3'))
+        cache.put('1/2/3', {'features': ['a', 'b']})
+        self.assertEqual({'features': ['a', 'b']}, cache.get('1/2/3'))
+        self.assertIsNone(cache.get('1/2/4'))
+
+    def test_lru_eviction(self):
+        cache = DiskCache(self.cache_dir, 2500)
+
+        cache.put('first', b'x' * 1000)
+        cache.put('second', b'x' * 1000)
+        os.utime(cache._entry_path('first'), (1, 1))
+        os.utime(cache._entry_path('second'), (2, 2))
+        # reading refreshes first, so second is the least recently used entry
+        cache.get('first')
+        cache.put('third', b'x' * 1000)
+
+        self.assertIsNotNone(cache.get('first'))
+        self.assertIsNone(cache.get('second'))
+        self.assertIsNotNone(cache.get('third'))
+
+        # an entry larger than the cache is kept until the next put
+        cache.put('large', b'x' * 5000)
+        self.assertIsNotNone(cache.get('large'))
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sparse
+
+from kb_functional_enrichment_1.Utils import EnrichmentPool
+from kb_functional_enrichment_1.Utils.EnrichmentPool import (enrichment_statistics,
+                                                             parallel_enrichment_statistics)
+from kb_functional_enrichment_1.Utils.FisherExact import fisher_exact
+
+
+class EnrichmentPoolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.RandomState(3)
+        cls.term_matrix = sparse.csc_matrix(rng.uniform(size=(300, 40)) < 0.1)
+        cls.feature_set_masks = rng.uniform(size=(300, 7)) < 0.15
+        cls.reference_mask = rng.uniform(size=300) < 0.9
+
+    def test_matches_single_feature_set(self):
+        statistics = enrichment_statistics(self.term_matrix, self.feature_set_masks,
+                                           self.reference_mask, 'right_tailed', True)
+
+        self.assertEqual(7, len(statistics))
+        for feature_set, (terms, a_values, raw_p_values) in enumerate(statistics):
+            feature_set_mask = self.feature_set_masks[:, feature_set] & self.reference_mask
+            counts = self.term_matrix.T.dot(feature_set_mask.astype(np.int64))
+            np.testing.assert_array_equal(np.flatnonzero(counts), terms)
+            np.testing.assert_array_equal(counts[terms], a_values)
+
+            term_sizes = np.diff(self.term_matrix.indptr)[terms]
+            feature_set_size = feature_set_mask.sum()
+            expected = fisher_exact(a_values, feature_set_size - a_values,
+                                    term_sizes - a_values,
+                                    self.reference_mask.sum() - feature_set_size -
+                                    term_sizes + a_values)[1]
+            np.testing.assert_allclose(expected, raw_p_values)
+
+    def test_parallel_matches_serial(self):
+        serial = enrichment_statistics(self.term_matrix, self.feature_set_masks,
+                                       self.reference_mask, 'two_tailed', False)
+        parallel = parallel_enrichment_statistics(3, self.term_matrix, self.feature_set_masks,
+                                                  self.reference_mask, 'two_tailed', False)
+
+        self.assertEqual(len(serial), len(parallel))
+        for serial_statistics, parallel_statistics in zip(serial, parallel):
+            for expected, value in zip(serial_statistics, parallel_statistics):
+                np.testing.assert_array_equal(expected, value)
+
+    def test_concurrent_parallel_calls(self):
+        rng = np.random.RandomState(4)
+        other_term_matrix = sparse.csc_matrix(rng.uniform(size=(300, 40)) < 0.2)
+        other_feature_set_masks = rng.uniform(size=(300, 7)) < 0.3
+        inputs = [(self.term_matrix, self.feature_set_masks),
+                  (other_term_matrix, other_feature_set_masks)]
+        expected = [enrichment_statistics(term_matrix, feature_set_masks, self.reference_mask,
+                                          'two_tailed', False)
+                    for term_matrix, feature_set_masks in inputs]
+
+        def run(call):
+            term_matrix, feature_set_masks = inputs[call % 2]
+            return parallel_enrichment_statistics(3, term_matrix, feature_set_masks,
+                                                  self.reference_mask, 'two_tailed', False)
+
+        # calls from different threads of one process use their own inputs
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(run, range(10)))
+
+        for call, statistics in enumerate(results):
+            for expected_statistics, parallel_statistics in zip(expected[call % 2], statistics):
+                for expected_value, value in zip(expected_statistics, parallel_statistics):
+                    np.testing.assert_array_equal(expected_value, value)
+
+    def test_pools_wait_for_a_slot(self):
+        results = []
+
+        def run():
+            results.append(parallel_enrichment_statistics(
+                3, self.term_matrix, self.feature_set_masks, self.reference_mask,
+                'two_tailed', False))
+
+        for _ in range(EnrichmentPool.MAX_CONCURRENT_POOLS):
+            EnrichmentPool._pool_slots.acquire()
+        try:
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join(0.5)
+            self.assertTrue(thread.is_alive())
+        finally:
+            for _ in range(EnrichmentPool.MAX_CONCURRENT_POOLS):
+                EnrichmentPool._pool_slots.release()
+        thread.join(30)
+        self.assertEqual(1, len(results))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+from fractions import Fraction
+from math import factorial
+
+from kb_functional_enrichment_1.Utils.FisherExact import fisher_exact
+
+
+def _comb(n, k):
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+def _exact_pvalues(a, b, c, d):
+    n = a + b + c + d
+    r = a + b
+    k = a + c
+    denominator = _comb(n, r)
+    pmf = {x: Fraction(_comb(k, x) * _comb(n - k, r - x), denominator)
+           for x in range(max(0, r + k - n), min(r, k) + 1)}
+    left_tail = sum(p for x, p in pmf.items() if x <= a)
+    right_tail = sum(p for x, p in pmf.items() if x >= a)
+    two_tail = sum(p for p in pmf.values() if p <= pmf[a])
+    return float(left_tail), float(right_tail), float(two_tail)
+
+
+class FisherExactTest(unittest.TestCase):
+
+    def test_matches_exact_computation(self):
+        rng = random.Random(42)
+        tables = [(1, 0, 5, 100), (0, 1, 5, 100), (3, 2, 10, 50), (12, 5, 3, 80),
+                  (0, 0, 0, 0), (5, 0, 0, 5)]
+        for _ in range(200):
+            feature_set_size = rng.randint(1, 40)
+            term_size = rng.randint(0, 60)
+            genome_size = rng.randint(feature_set_size + term_size, 300)
+            a = rng.randint(max(0, feature_set_size + term_size - genome_size),
+                            min(feature_set_size, term_size))
+            tables.append((a, feature_set_size - a, term_size - a,
+                           genome_size - feature_set_size - term_size + a))
+
+        left_tail, right_tail, two_tail = fisher_exact(*zip(*tables))
+
+        for pos, table in enumerate(tables):
+            expected = _exact_pvalues(*table)
+            for expected_p_value, p_value in zip(expected, [left_tail[pos], right_tail[pos],
+                                                            two_tail[pos]]):
+                self.assertAlmostEqual(expected_p_value, p_value,
+                                       delta=1e-9 * expected_p_value + 1e-15)
+
+    def test_small_tail_precision(self):
+        left_tail, right_tail, _ = fisher_exact([40], [0], [0], [4000])
+
+        expected = _exact_pvalues(40, 0, 0, 4000)
+        self.assertEqual(1.0, left_tail[0])
+        self.assertAlmostEqual(1.0, right_tail[0] / expected[1], places=9)
+
+    def test_invalid_tables(self):
+        with self.assertRaisesRegex(ValueError, 'must be non-negative'):
+            fisher_exact([1], [-1], [0], [0])
+        with self.assertRaisesRegex(ValueError, 'must have the same length'):
+            fisher_exact([1, 2], [1], [0], [0])
+
+        self.assertEqual(0, len(fisher_exact([], [], [], [])[0]))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from kb_functional_enrichment_1.Utils.GenomeAnnotation import GenomeAnnotationBuilder
+
+
+class GenomeAnnotationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        builder = GenomeAnnotationBuilder()
+        builder.add_feature('f1', {'GO:0000002': 'child', 'PF00001': 'not a GO term'})
+        builder.add_feature('f2', {})
+        builder.add_feature('f3', {'go:0000003': 'other child', 'GO:0000001': 'root'})
+        builder.add_feature('f4', None)
+        cls.annotation = builder.build()
+
+    def test_build(self):
+        annotation = self.annotation
+
+        self.assertEqual(['f1', 'f2', 'f3', 'f4'], annotation.feature_ids)
+        self.assertEqual(['GO:0000002', 'go:0000003', 'GO:0000001'], annotation.term_ids)
+        self.assertEqual(['child', 'other child', 'root'], annotation.term_names)
+        self.assertEqual((4, 3), annotation.matrix.shape)
+        self.assertEqual([True, False, True, False], annotation.annotated_features().tolist())
+        self.assertEqual(['go:0000003', 'GO:0000001'], annotation.feature_terms(2))
+        self.assertEqual([False, True, False, True],
+                         annotation.feature_mask(['f2', 'f4', 'unknown']).tolist())
+
+    def test_sort_by_feature_id(self):
+        builder = GenomeAnnotationBuilder(sort_by_feature_id=True)
+        builder.add_feature('f3', {'GO:0000003': 'late name', 'GO:0000001': 'root'})
+        builder.add_feature('f1', {'GO:0000001': 'root', 'GO:0000002': 'child'})
+        builder.add_feature('f2', {'GO:0000003': 'early name'})
+        annotation = builder.build()
+
+        # built as if the features had been added in feature id order
+        self.assertEqual(['f1', 'f2', 'f3'], annotation.feature_ids)
+        self.assertEqual(['GO:0000001', 'GO:0000002', 'GO:0000003'], annotation.term_ids)
+        self.assertEqual(['root', 'child', 'late name'], annotation.term_names)
+        self.assertEqual(['GO:0000001', 'GO:0000002'], annotation.feature_terms(0))
+        self.assertEqual(['GO:0000003'], annotation.feature_terms(1))
+        self.assertEqual(['GO:0000003', 'GO:0000001'], annotation.feature_terms(2))
+
+    def test_propagate(self):
+        annotation = self.annotation
+
+        term_matrix = annotation.propagate({'GO:0000002': ['GO:0000001', 'GO:9999999'],
+                                            'go:0000003': ['GO:0000001'],
+                                            'GO:0000001': []})
+
+        self.assertEqual(['f1'], annotation.term_features(term_matrix, 0))
+        self.assertEqual(['f3'], annotation.term_features(term_matrix, 1))
+        self.assertEqual(['f1', 'f3'], annotation.term_features(term_matrix, 2))
+        self.assertEqual([1, 1, 2], term_matrix.T.dot([1, 1, 1, 1]).tolist())
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+import unittest
+
+from benchmark.fakes import FakeWorkspace
+from benchmark.run_benchmark import make_fe_util
+
+
+def _feature(feature_id, feature_type, terms):
+    ontology_terms = {}
+    for term_id, term_name in terms.items():
+        namespace = 'GO' if term_id.startswith('GO:') else 'PFAM'
+        ontology_terms.setdefault(namespace, {})[term_id] = {
+            'id': term_id, 'term_name': term_name, 'evidence': [], 'term_lineage': []}
+    return {'id': feature_id, 'type': feature_type, 'ontology_terms': ontology_terms}
+
+
+class GenomeLoaderTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workspace = FakeWorkspace()
+        # feature ids of the four arrays interleave, and GO:0000002 is named differently
+        # by a gene and by its CDS
+        genome = {
+            'id': 'genome', 'scientific_name': 'test genome', 'domain': 'Eukaryota',
+            'features': [_feature('g2', 'gene', {'GO:0000002': 'gene name'}),
+                         _feature('g1', 'gene', {'GO:0000001': 'root', 'PF00001': 'pfam'}),
+                         _feature('g3', 'gene', {})],
+            'cdss': [_feature('g2.CDS', 'CDS', {'GO:0000002': 'cds name',
+                                                'GO:0000003': 'cds term'}),
+                     _feature('g1.CDS', 'CDS', {})],
+            'mrnas': [_feature('g1.mRNA', 'mRNA', {'GO:0000004': 'mrna term'}),
+                      _feature('g2.mRNA', 'mRNA', {'GO:0000001': 'root'})],
+            'non_coding_features': [_feature('a0.rRNA', 'rRNA', {'GO:0000005': 'rrna term'}),
+                                    _feature('z9.tRNA', 'tRNA', {})]}
+        cls.genome_ref = cls.workspace.save_object(10, 'test', 'genome',
+                                                   'KBaseGenomes.Genome', genome)
+
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.scratch)
+
+    def _load(self, genome_loader):
+        fe_util = make_fe_util(self.scratch, self.workspace, {'genome-loader': genome_loader})
+        return fe_util._get_genome_annotation(self.genome_ref)
+
+    def test_loaders_agree(self):
+        workspace_annotation = self._load('workspace')
+        search_annotation = self._load('genome_search_util')
+
+        # every feature array is read, in feature id order like GenomeSearchUtil.search
+        self.assertEqual(['a0.rRNA', 'g1', 'g1.CDS', 'g1.mRNA', 'g2', 'g2.CDS', 'g2.mRNA',
+                          'g3', 'z9.tRNA'], workspace_annotation.feature_ids)
+        self.assertEqual(search_annotation.feature_ids, workspace_annotation.feature_ids)
+        self.assertEqual(search_annotation.term_ids, workspace_annotation.term_ids)
+        self.assertEqual(search_annotation.term_names, workspace_annotation.term_names)
+        self.assertEqual(search_annotation.matrix.toarray().tolist(),
+                         workspace_annotation.matrix.toarray().tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
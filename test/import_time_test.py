@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# wall time budget in seconds for a fresh interpreter to import the module, construct it and
+# answer status; generous enough for a loaded CI host, far below the cost of numpy, scipy
+# and R initialization
+IMPORT_TIME_BUDGET = 1.5
+HEAVY_MODULES = ['numpy', 'scipy', 'rpy2', 'installed_clients.WorkspaceClient']
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+DEPLOY_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'deploy.cfg')
+
+_STATUS_SCRIPT = '''
+import json, sys, time
+start = time.time()
+from kb_functional_enrichment_1.kb_functional_enrichment_1Impl import kb_functional_enrichment_1
+status = kb_functional_enrichment_1({}).status(None)[0]
+print(json.dumps({'seconds': time.time() - start, 'state': status['state'],
+                  'modules': sorted(name for name in %r if name in sys.modules)}))
+''' % (HEAVY_MODULES,)
+
+_RESIDENT_SCRIPT = '''
+import json, sys, threading, time
+from kb_functional_enrichment_1.kb_functional_enrichment_1Impl import kb_functional_enrichment_1
+impl = kb_functional_enrichment_1({'resident-ontology': 'true'})
+impl.status(None)
+time.sleep(0.5)
+print(json.dumps({'threads': [thread.name for thread in threading.enumerate()],
+                  'modules': sorted(name for name in %r if name in sys.modules)}))
+''' % (HEAVY_MODULES,)
+
+_SERVER_SCRIPT = '''
+import json, sys, time
+start = time.time()
+from kb_functional_enrichment_1 import kb_functional_enrichment_1Server
+print(json.dumps({'seconds': time.time() - start,
+                  'modules': sorted(name for name in %r if name in sys.modules)}))
+''' % (HEAVY_MODULES,)
+
+
+def _run(script):
+    env = dict(os.environ, PYTHONPATH=LIB_DIR, SDK_CALLBACK_URL='http://localhost',
+               KB_AUTH_TOKEN='token', KB_DEPLOYMENT_CONFIG=DEPLOY_CONFIG)
+    output = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def _has_server_dependencies():
+    try:
+        import jsonrpcbase  # noqa: F401
+        import biokbase.log  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    def test_status_startup(self):
+        result = _run(_STATUS_SCRIPT)
+
+        self.assertEqual('OK', result['state'])
+        self.assertEqual([], result['modules'])
+        self.assertLess(result['seconds'], IMPORT_TIME_BUDGET)
+
+    def test_resident_ontology_not_started(self):
+        # outside a uWSGI service process, constructing the module starts no ontology load
+        result = _run(_RESIDENT_SCRIPT)
+
+        self.assertNotIn('resident-ontology', result['threads'])
+        self.assertEqual([], result['modules'])
+
+    @unittest.skipUnless(_has_server_dependencies(), 'jsonrpcbase or biokbase is not installed')
+    def test_server_startup(self):
+        result = _run(_SERVER_SCRIPT)
+
+        self.assertEqual([], result['modules'])
+        self.assertLess(result['seconds'], IMPORT_TIME_BUDGET)
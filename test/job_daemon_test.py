@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from kb_functional_enrichment_1.Utils.JobDaemon import _run_daemon_job, forward_job
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+_DAEMON_SCRIPT = '''
+import json, os, sys
+from kb_functional_enrichment_1.Utils.JobDaemon import JobDaemon
+
+def run_job(request):
+    with open(request['input']) as input_file:
+        job = json.load(input_file)
+    print('job {} running in {}'.format(job['name'], os.getcwd()))
+    with open(request['output'], 'w') as output_file:
+        json.dump({'daemon_pid': os.getppid(), 'job_pid': os.getpid()}, output_file)
+    return job['exit_code']
+
+JobDaemon(sys.argv[1], run_job).serve_forever()
+'''
+
+_CLIENT_SCRIPT = '''
+import sys
+from kb_functional_enrichment_1.Utils.JobDaemon import forward_job
+print('exit code', forward_job(sys.argv[1], {'input': sys.argv[2], 'output': sys.argv[3]}))
+'''
+
+
+class JobDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, 'daemon.sock')
+        self.env = dict(os.environ, PYTHONPATH=LIB_DIR, SDK_CALLBACK_URL='http://localhost',
+                        KB_AUTH_TOKEN='token')
+        self.daemon = subprocess.Popen([sys.executable, '-c', _DAEMON_SCRIPT, self.socket_path],
+                                       env=self.env)
+        deadline = time.time() + 10
+        while not os.path.exists(self.socket_path) and time.time() < deadline:
+            time.sleep(0.02)
+
+    def tearDown(self):
+        self.daemon.kill()
+        self.daemon.wait()
+        shutil.rmtree(self.tmp_dir)
+
+    def _forward(self, name, exit_code):
+        input_path = os.path.join(self.tmp_dir, name + '_input.json')
+        output_path = os.path.join(self.tmp_dir, name + '_output.json')
+        with open(input_path, 'w') as input_file:
+            json.dump({'name': name, 'exit_code': exit_code}, input_file)
+        stdout = subprocess.check_output(
+            [sys.executable, '-c', _CLIENT_SCRIPT, self.socket_path, input_path, output_path],
+            env=self.env, cwd=self.tmp_dir).decode('utf-8')
+        with open(output_path) as output_file:
+            return stdout, json.load(output_file)
+
+    def test_forward_job(self):
+        # only the daemon user may connect
+        self.assertEqual(0, os.stat(self.socket_path).st_mode & 0o077)
+
+        stdout, output = self._forward('first', 0)
+        # the job ran in a process forked from the daemon and logged to the client's stdout
+        self.assertIn('job first running in {}'.format(os.path.realpath(self.tmp_dir)),
+                      stdout)
+        self.assertIn('exit code 0', stdout)
+        self.assertEqual(self.daemon.pid, output['daemon_pid'])
+
+        stdout, second_output = self._forward('second', 500)
+        self.assertIn('exit code 500', stdout)
+        self.assertNotEqual(output['job_pid'], second_output['job_pid'])
+
+    def test_run_async_job(self):
+        config_path = os.path.join(self.tmp_dir, 'deploy.cfg')
+        with open(config_path, 'w') as config_file:
+            config_file.write('[kb_functional_enrichment_1]\n'
+                              'job-daemon-socket = {}\n'.format(self.socket_path))
+        input_path = os.path.join(self.tmp_dir, 'cli_input.json')
+        output_path = os.path.join(self.tmp_dir, 'cli_output.json')
+        with open(input_path, 'w') as input_file:
+            json.dump({'name': 'cli', 'exit_code': 3}, input_file)
+
+        # the async job entry point forwards to the daemon configured in the deployment config
+        process = subprocess.run(
+            [sys.executable, '-m', 'kb_functional_enrichment_1.Utils.JobDaemon', input_path,
+             output_path, 'token'],
+            env=dict(self.env, KB_DEPLOYMENT_CONFIG=config_path), cwd=self.tmp_dir,
+            stdout=subprocess.PIPE)
+        self.assertEqual(3, process.returncode)
+        self.assertIn('job cli running', process.stdout.decode('utf-8'))
+        with open(output_path) as output_file:
+            self.assertEqual(self.daemon.pid, json.load(output_file)['daemon_pid'])
+
+    def test_reject_job_without_environment(self):
+        # a job never runs with the daemon's own callback URL and token
+        with self.assertRaisesRegex(ValueError, 'missing KB_AUTH_TOKEN'):
+            _run_daemon_job({'input': 'input.json', 'output': 'output.json',
+                             'SDK_CALLBACK_URL': 'http://localhost'})
+
+    def test_no_daemon(self):
+        self.assertIsNone(forward_job(os.path.join(self.tmp_dir, 'missing.sock'),
+                                      {'input': 'input.json', 'output': 'output.json'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
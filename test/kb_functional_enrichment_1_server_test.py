@@ -201,6 +201,47 @@ class kb_functional_enrichment_1Test(unittest.TestCase):
                 'filter_ref_features': 1
             })
 
+    def test_ontology_cache(self):
+        ontology_cache = self.fe1_runner.ontology_cache
+
+        ontology_hash = ontology_cache.get_term_hash()
+        self.assertIn('GO:0003677', ontology_hash)
+        self.assertIn('namespace', ontology_hash['GO:0003677'])
+
+        cache_files = [f for f in os.listdir(ontology_cache.cache_dir)
+                       if f.startswith('term_hash_')]
+        self.assertEqual(1, len(cache_files))
+        cache_mtime = os.path.getmtime(os.path.join(ontology_cache.cache_dir, cache_files[0]))
+
+        # second call is served from the cache file
+        self.assertEqual(ontology_hash, ontology_cache.get_term_hash())
+        self.assertEqual(cache_mtime,
+                         os.path.getmtime(os.path.join(ontology_cache.cache_dir, cache_files[0])))
+
+        ontology = ontology_cache.get_compiled_ontology()
+        self.assertIn('GO:0003677', ontology)
+        self.assertEqual(ontology_hash['GO:0003677']['namespace'],
+                         ontology.namespace('GO:0003677'))
+        self.assertTrue(ontology.ancestors('GO:0003677', ['is_a']))
+        self.assertTrue(any(f.startswith('compiled_ontology_')
+                            for f in os.listdir(ontology_cache.cache_dir)))
+
+    def test_genome_loaders(self):
+        workspace_annotation = self.fe1_runner._build_workspace_genome_annotation(
+            self.genome_ref)
+        search_features = list(self.fe1_runner._iter_genome_features(self.genome_ref))
+
+        self.assertEqual([f['feature_id'] for f in search_features],
+                         workspace_annotation.feature_ids)
+        for feature, search_feature in enumerate(search_features):
+            go_terms = {term_id: term_name
+                        for term_id, term_name in search_feature.get('ontology_terms').items()
+                        if term_id.upper().startswith('GO:')}
+            self.assertEqual(
+                go_terms,
+                {term_id: workspace_annotation.term_names[workspace_annotation.term_index[term_id]]
+                 for term_id in workspace_annotation.feature_terms(feature)})
+
     def test_run_fe1(self):
 
         input_params = {
@@ -215,8 +256,11 @@ class kb_functional_enrichment_1Test(unittest.TestCase):
         self.assertTrue('result_directory' in result)
         result_files = os.listdir(result['result_directory'])
         print(result_files)
-        expect_result_files = ['functional_enrichment.csv']
+        expect_result_files = ['functional_enrichment.csv', 'stage_timings.json']
         self.assertTrue(all(x in result_files for x in expect_result_files))
+        stages = [stage_timing['stage'] for stage_timing in result['stage_timings']]
+        self.assertTrue(all(x in stages for x in ['feature_set_load', 'genome_load',
+                                                  'statistics', 'report_creation']))
 
         with open(os.path.join(result['result_directory'],
                   'functional_enrichment.csv'), 'r') as f:
@@ -270,3 +314,49 @@ class kb_functional_enrichment_1Test(unittest.TestCase):
 
         self.assertTrue(result.get('report_name'))
         self.assertTrue(result.get('report_ref'))
+
+    def test_bad_run_fe1_batch_params(self):
+        with self.assertRaisesRegex(ValueError,
+                                    '"feature_set_refs" must be a non-empty list'):
+            self.getImpl().run_fe1_batch(self.getContext(), {
+                'feature_set_refs': [],
+                'workspace_name': self.getWsName()})
+
+        with self.assertRaisesRegex(ValueError, 'FeatureSets reference multiple Genomes'):
+            self.getImpl().run_fe1_batch(self.getContext(), {
+                'feature_set_refs': [self.feature_set_ref, self.bad_genome_feature_set],
+                'workspace_name': self.getWsName()})
+
+    def test_run_fe1_batch(self):
+
+        input_params = {
+            'feature_set_refs': [self.feature_set_ref, self.bad_id_feature_set],
+            'workspace_name': self.getWsName(),
+            'propagation': 1,
+            'filter_ref_features': 1
+        }
+        with self.assertRaisesRegex(ValueError,
+                                    'feature ids which are not present referenced genome'):
+            self.getImpl().run_fe1_batch(self.getContext(), input_params)
+
+        input_params['feature_set_refs'] = [self.feature_set_ref]
+        result = self.getImpl().run_fe1_batch(self.getContext(), input_params)[0]
+        single_result = self.getImpl().run_fe1(self.getContext(), {
+            'feature_set_ref': self.feature_set_ref,
+            'workspace_name': self.getWsName(),
+            'propagation': 1,
+            'filter_ref_features': 1
+        })[0]
+
+        with open(os.path.join(result['result_directory'],
+                  'functional_enrichment.csv'), 'r') as f:
+            rows = list(csv.reader(f))
+        with open(os.path.join(single_result['result_directory'],
+                  'functional_enrichment.csv'), 'r') as f:
+            single_rows = list(csv.reader(f))
+
+        self.assertEqual(['feature_set_ref'] + single_rows[0], rows[0])
+        self.assertEqual([[self.feature_set_ref] + row for row in single_rows[1:]], rows[1:])
+
+        self.assertTrue(result.get('report_name'))
+        self.assertTrue(result.get('report_ref'))
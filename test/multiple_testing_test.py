@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import numpy as np
+
+from kb_functional_enrichment_1.Utils.MultipleTesting import P_ADJUST_METHODS, p_adjust
+
+try:
+    from rpy2.robjects.packages import importr
+    from rpy2.robjects.vectors import FloatVector
+except ImportError:
+    importr = None
+
+
+class MultipleTestingTest(unittest.TestCase):
+
+    p_values = [0.01, 0.02, 0.03, 0.04, 0.05, 0.5, 0.001, 0.2, 0.03]
+
+    def test_known_values(self):
+        # expected values worked out from the definitions in R's ?p.adjust
+        expected = {
+            'bonferroni': [0.09, 0.18, 0.27, 0.36, 0.45, 1, 0.009, 1, 0.27],
+            'holm': [0.08, 0.14, 0.18, 0.18, 0.18, 0.5, 0.009, 0.4, 0.18],
+            'hochberg': [0.08, 0.14, 0.15, 0.15, 0.15, 0.5, 0.009, 0.4, 0.15],
+            'BH': [0.045, 0.054, 0.054, 0.06, 0.0642857142857143, 0.5, 0.009, 0.225, 0.054],
+            'fdr': [0.045, 0.054, 0.054, 0.06, 0.0642857142857143, 0.5, 0.009, 0.225, 0.054],
+            'none': self.p_values,
+        }
+        for method, expected_values in expected.items():
+            np.testing.assert_allclose(p_adjust(self.p_values, method), expected_values,
+                                       rtol=1e-12, err_msg=method)
+
+        by_factor = sum(1 / i for i in range(1, 10))
+        np.testing.assert_allclose(p_adjust(self.p_values, 'BY'),
+                                   np.minimum(1, np.array(expected['BH']) * by_factor),
+                                   rtol=1e-12)
+
+    def test_hommel(self):
+        adjusted = p_adjust(self.p_values, 'hommel')
+
+        # Hommel is at least as powerful as Hochberg and never below the raw p-value
+        self.assertTrue(np.all(adjusted <= p_adjust(self.p_values, 'hochberg') + 1e-15))
+        self.assertTrue(np.all(adjusted >= self.p_values))
+        np.testing.assert_allclose(p_adjust([0.01, 0.04], 'hommel'),
+                                   p_adjust([0.01, 0.04], 'hochberg'))
+
+    def test_nan_and_edge_cases(self):
+        # NaN p-values don't count towards n, p.adjust(c(0.01, NA, 0.02), "bonferroni")
+        adjusted = p_adjust([0.01, float('nan'), 0.02], 'bonferroni')
+        self.assertTrue(np.isnan(adjusted[1]))
+        np.testing.assert_allclose(adjusted[[0, 2]], [0.02, 0.04])
+        np.testing.assert_allclose(p_adjust([0.01, float('nan'), 0.02], 'bonferroni', n=3)[[0, 2]],
+                                   [0.03, 0.06])
+        np.testing.assert_allclose(p_adjust([float('nan'), 0.2], 'BH')[1], 0.2)
+
+        np.testing.assert_allclose(p_adjust([0.2], 'BH'), [0.2])
+        self.assertEqual(0, len(p_adjust([], 'BH')))
+        np.testing.assert_allclose(p_adjust([0.01, 0.02], 'bonferroni', n=10), [0.1, 0.2])
+
+        with self.assertRaisesRegex(ValueError, 'n must be at least'):
+            p_adjust([0.01, 0.02, 0.03], 'BH', n=2)
+        with self.assertRaisesRegex(ValueError, 'Unknown p-value adjustment method'):
+            p_adjust([0.01, 0.02], 'sidak')
+
+    @unittest.skipIf(importr is None, 'rpy2 is not installed')
+    def test_matches_r(self):
+        stats = importr('stats')
+        rng = np.random.RandomState(7)
+        samples = [self.p_values, rng.uniform(size=500), rng.uniform(size=50) ** 4,
+                   np.round(rng.uniform(size=200), 2), rng.uniform(size=3),
+                   [0.01, float('nan'), 0.02, 0.5]]
+        for sample in samples:
+            for method in P_ADJUST_METHODS:
+                expected = np.array(stats.p_adjust(FloatVector(sample), method=method))
+                np.testing.assert_array_equal(expected, p_adjust(sample, method),
+                                              err_msg=method)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import tempfile
+import unittest
+
+from kb_functional_enrichment_1.Utils.OntologyCompiler import CompiledOntology, compile_ontology
+
+
+class OntologyCompilerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ontology_hash = {
+            'GO:0000001': {'name': 'root', 'namespace': 'biological_process'},
+            'GO:0000002': {'name': 'child', 'namespace': 'biological_process',
+                           'is_a': ['GO:0000001 ! root']},
+            'GO:0000003': {'name': 'other child', 'namespace': 'biological_process',
+                           'is_a': ['GO:0000001 ! root'],
+                           'relationship': ['regulates GO:0000005 ! regulated']},
+            'GO:0000004': {'name': 'grand child', 'namespace': 'biological_process',
+                           'is_a': ['GO:0000002 ! child', 'GO:0000003 ! other child'],
+                           'relationship': ['part_of GO:0000006 ! whole']},
+            'GO:0000005': {'name': 'regulated', 'namespace': 'biological_process'},
+            'GO:0000006': {'name': 'whole', 'namespace': 'cellular_component',
+                           'is_a': ['GO:0000099 ! undefined']},
+        }
+
+    def test_ancestors(self):
+        ontology = compile_ontology(self.ontology_hash)
+
+        self.assertEqual([], ontology.ancestors('GO:0000001', ['is_a']))
+        self.assertEqual(['GO:0000001', 'GO:0000002', 'GO:0000003'],
+                         sorted(ontology.ancestors('GO:0000004', ['is_a'])))
+        self.assertEqual(['GO:0000001', 'GO:0000002', 'GO:0000003', 'GO:0000005'],
+                         sorted(ontology.ancestors('GO:0000004', ['is_a', 'regulates'])))
+        self.assertEqual(['GO:0000001', 'GO:0000002', 'GO:0000003', 'GO:0000006',
+                          'GO:0000099'],
+                         sorted(ontology.ancestors('GO:0000004', ['is_a', 'part_of'])))
+        self.assertEqual([], ontology.ancestors('GO:non_exist', ['is_a']))
+
+    def test_namespace(self):
+        ontology = compile_ontology(self.ontology_hash)
+
+        self.assertIn('GO:0000006', ontology)
+        self.assertEqual('cellular_component', ontology.namespace('GO:0000006'))
+        # parents missing from term_hash are indexed but not defined
+        self.assertNotIn('GO:0000099', ontology)
+        self.assertIsNone(ontology.namespace('GO:0000099'))
+
+    def test_save_load(self):
+        ontology = compile_ontology(self.ontology_hash)
+
+        buffer = io.BytesIO()
+        ontology.save(buffer)
+        loaded = CompiledOntology.from_buffer(buffer.getvalue())
+
+        self.assertEqual(ontology.term_ids, loaded.term_ids)
+        self.assertEqual(ontology.names, loaded.names)
+        self.assertEqual('biological_process', loaded.namespace('GO:0000004'))
+        self.assertIn(('is_a',), loaded.closures)
+        self.assertEqual(sorted(ontology.ancestors('GO:0000004', ['is_a', 'part_of'])),
+                         sorted(loaded.ancestors('GO:0000004', ['is_a', 'part_of'])))
+
+    def test_load_memory_maps_file(self):
+        ontology = compile_ontology(self.ontology_hash)
+        ontology.ancestor_closure(['is_a', 'part_of'])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'compiled.ontology')
+            with open(file_path, 'wb') as ontology_file:
+                ontology.save(ontology_file)
+            loaded = CompiledOntology.load(file_path)
+
+            self.assertEqual(len(ontology), len(loaded))
+            self.assertIn(('is_a', 'part_of'), loaded.closures)
+            for array in loaded.arrays.values():
+                self.assertFalse(array.flags.writeable)
+            self.assertEqual(['GO:0000001', 'GO:0000002', 'GO:0000003', 'GO:0000006',
+                              'GO:0000099'],
+                             sorted(loaded.ancestors('GO:0000004', ['is_a', 'part_of'])))
+            self.assertEqual(['GO:0000001', 'GO:0000002', 'GO:0000003', 'GO:0000005'],
+                             sorted(loaded.ancestors('GO:0000004', ['is_a', 'regulates'])))
+            self.assertIsNone(loaded.term_index('GO:non_exist'))
+            self.assertIsNone(loaded.term_index('GO:00000010000000'))
+
+        with self.assertRaises(ValueError):
+            CompiledOntology.from_buffer(b'not an ontology')
+
+    def test_deep_and_cyclic_hierarchy(self):
+        depth = 2000
+        ontology_hash = {'GO:{:07d}'.format(i): {'namespace': 'biological_process',
+                                                 'is_a': ['GO:{:07d} ! parent'.format(i - 1)]}
+                         for i in range(1, depth)}
+        ontology_hash['GO:0000000'] = {'namespace': 'biological_process'}
+        # GO:0000001 and GO:0000002 form a part_of cycle
+        ontology_hash['GO:0000001']['relationship'] = ['part_of GO:0000002 ! cycle']
+
+        ontology = compile_ontology(ontology_hash)
+
+        self.assertEqual(depth - 1, len(ontology.ancestors('GO:{:07d}'.format(depth - 1),
+                                                           ['is_a'])))
+        self.assertEqual(['GO:0000000', 'GO:0000002'],
+                         sorted(ontology.ancestors('GO:0000001', ['is_a', 'part_of'])))
+        self.assertEqual(['GO:0000000', 'GO:0000001'],
+                         sorted(ontology.ancestors('GO:0000002', ['is_a', 'part_of'])))
+        self.assertEqual(depth - 1, len(ontology.ancestors('GO:{:07d}'.format(depth - 1),
+                                                           ['is_a', 'part_of'])))
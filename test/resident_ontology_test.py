@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from kb_functional_enrichment_1.Utils.ResidentOntology import ResidentOntology
+
+
+class ResidentOntologyTest(unittest.TestCase):
+
+    def test_get_waits_for_first_load(self):
+        release = threading.Event()
+        loads = []
+
+        def load_ontology():
+            release.wait()
+            loads.append(1)
+            return 'ontology {}'.format(len(loads))
+
+        resident = ResidentOntology(load_ontology, refresh_seconds=3600)
+        resident.start()
+        threading.Timer(0.05, release.set).start()
+
+        self.assertEqual('ontology 1', resident.get())
+        self.assertEqual('ontology 1', resident.get())
+        self.assertEqual(1, len(loads))
+
+    def test_refresh(self):
+        loads = []
+
+        def load_ontology():
+            loads.append(1)
+            if len(loads) == 2:
+                raise ValueError('Workspace unavailable')
+            return 'ontology {}'.format(len(loads))
+
+        resident = ResidentOntology(load_ontology, refresh_seconds=0.2)
+        self.assertEqual('ontology 1', resident.get())
+
+        # the failed second load keeps the first ontology
+        deadline = time.time() + 5
+        while len(loads) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual('ontology 1', resident.get())
+
+        while resident.get() != 'ontology 3' and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual('ontology 3', resident.get())
+        self.assertEqual(3, len(loads))
+
+    def test_failed_first_load(self):
+        def load_ontology():
+            raise ValueError('Workspace unavailable')
+
+        resident = ResidentOntology(load_ontology, refresh_seconds=3600)
+        self.assertIsNone(resident.get(timeout=5))
+
+
+if __name__ == '__main__':
+    unittest.main()
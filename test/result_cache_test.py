@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmark.run_benchmark import build_workspace, make_fe_util
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.workspace, cls.feature_set_ref = build_workspace(300, term_count=200, seed=2)
+
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.scratch)
+
+    def _run_fe1(self, config=None, **params):
+        fe_util = make_fe_util(self.scratch, self.workspace,
+                               dict({'result-cache-max-bytes': str(10 * 1024 ** 2)},
+                                    **(config or {})))
+        fe_util.ontology_cache.get_compiled_ontology = mock.Mock(
+            wraps=fe_util.ontology_cache.get_compiled_ontology)
+        result = fe_util.run_fe1(dict({'feature_set_ref': self.feature_set_ref,
+                                       'workspace_name': 'test_workspace'}, **params))
+        with open(os.path.join(result['result_directory'], 'functional_enrichment.csv')) as f:
+            csv = f.read()
+        # the genome annotation and the ontology are only loaded when no result is cached
+        computed = 'genome_load' in [stage['stage'] for stage in result['stage_timings']]
+        self.assertEqual(computed, fe_util.ontology_cache.get_compiled_ontology.call_count > 0)
+        return result, csv, fe_util.kbase_report.reports, computed
+
+    def test_repeated_run(self):
+        result, csv, reports, computed = self._run_fe1()
+        self.assertTrue(computed)
+        self.assertEqual(1, len(reports))
+
+        cached, cached_csv, cached_reports, computed = self._run_fe1(propagation=1)
+        self.assertFalse(computed)
+        self.assertEqual(csv, cached_csv)
+        self.assertNotEqual(result['result_directory'], cached['result_directory'])
+        self.assertTrue(os.path.isfile(os.path.join(cached['result_directory'],
+                                                    'supporting_files.zip')))
+        # a new report is created from the cached files
+        self.assertEqual(1, len(cached_reports))
+        self.assertEqual(reports[0]['file_links'][0]['name'],
+                         cached_reports[0]['file_links'][0]['name'])
+
+        _, _, _, computed = self._run_fe1(statistical_significance='right_tailed')
+        self.assertTrue(computed)
+
+    def test_reuse_report(self):
+        config = {'result-cache-reuse-report': 'true'}
+        result, _, _, _ = self._run_fe1(config)
+
+        cached, _, reports, _ = self._run_fe1(config)
+        self.assertEqual(result['report_name'], cached['report_name'])
+        self.assertEqual([], reports)
+
+        # the cached report is only reused in the workspace it was saved to
+        other, _, reports, _ = self._run_fe1(config, workspace_name='other_workspace')
+        self.assertNotEqual(result['report_name'], other['report_name'])
+        self.assertEqual(1, len(reports))
+
+
+if __name__ == '__main__':
+    unittest.main()
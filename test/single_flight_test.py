@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from kb_functional_enrichment_1.Utils.SingleFlight import SingleFlight
+
+
+def _locked_call(lock_dir, log_path):
+    def load():
+        with open(log_path, 'a') as log_file:
+            log_file.write('start {}\n'.format(os.getpid()))
+        time.sleep(0.2)
+        with open(log_path, 'a') as log_file:
+            log_file.write('end {}\n'.format(os.getpid()))
+        return os.getpid()
+
+    SingleFlight().do('genome', load, lock_dir=lock_dir)
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_concurrent_calls_share_one_call(self):
+        flights = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def load():
+            calls.append(1)
+            release.wait()
+            return object()
+
+        with ThreadPoolExecutor(max_workers=9) as executor:
+            futures = [executor.submit(flights.do, 'genome', load) for _ in range(8)]
+            time.sleep(0.1)
+            other = executor.submit(flights.do, 'ontology', lambda: 'ontology')
+            self.assertEqual('ontology', other.result(timeout=5))
+            release.set()
+            results = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(1, len(calls))
+        self.assertTrue(all(result is results[0] for result in results))
+
+        # finished calls are not remembered
+        self.assertEqual('again', flights.do('genome', lambda: 'again'))
+
+    def test_exception_is_shared(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def load():
+            release.wait()
+            raise ValueError('Workspace unavailable')
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(flights.do, 'genome', load) for _ in range(4)]
+            time.sleep(0.1)
+            release.set()
+            for future in futures:
+                with self.assertRaisesRegex(ValueError, 'Workspace unavailable'):
+                    future.result(timeout=5)
+
+    def test_processes_take_turns(self):
+        lock_dir = os.path.join(self.tmp_dir, 'locks')
+        log_path = os.path.join(self.tmp_dir, 'calls.log')
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=_locked_call, args=(lock_dir, log_path))
+                     for _ in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+
+        with open(log_path) as log_file:
+            events = [line.split() for line in log_file]
+        self.assertEqual(6, len(events))
+        # every call ends before the next one starts
+        for start, end in zip(events[::2], events[1::2]):
+            self.assertEqual(['start', 'end'], [start[0], end[0]])
+            self.assertEqual(start[1], end[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
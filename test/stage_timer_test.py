@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from kb_functional_enrichment_1.Utils.StageTimer import StageTimer
+
+
+class StageTimerTest(unittest.TestCase):
+
+    def test_stages(self):
+        timer = StageTimer()
+        with timer.stage('load'):
+            time.sleep(0.05)
+        with timer.stage('compute'):
+            sum(i * i for i in range(200000))
+        with timer.stage('load'):
+            time.sleep(0.05)
+
+        stages = timer.stage_timings()
+        self.assertEqual(['load', 'compute'], [stage['stage'] for stage in stages])
+        load, compute = stages
+        self.assertGreaterEqual(load['wall_time'], 0.1)
+        self.assertLess(load['cpu_time'], 0.05)
+        self.assertGreater(compute['cpu_time'], 0)
+        self.assertGreater(compute['rss'], 0)
+        self.assertLessEqual(compute['rss'], compute['peak_rss'])
+        self.assertEqual(0, compute['bytes_received'])
+
+    def test_concurrent_stage(self):
+        timer = StageTimer()
+
+        def work():
+            with timer.stage('fetch'):
+                time.sleep(0.1)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        fetch = timer.stage_timings()[0]
+        # the stage spans the concurrent runs instead of adding them up
+        self.assertGreaterEqual(fetch['wall_time'], 0.1)
+        self.assertLess(fetch['wall_time'], 0.3)
+
+    def test_save(self):
+        timer = StageTimer()
+        with timer.stage('load'):
+            pass
+
+        result_directory = tempfile.mkdtemp()
+        try:
+            timing_file = os.path.join(result_directory, 'stage_timings.json')
+            timer.save(timing_file)
+            with open(timing_file) as f:
+                timings = json.load(f)
+        finally:
+            shutil.rmtree(result_directory)
+
+        self.assertEqual(['load'], [stage['stage'] for stage in timings['stages']])
+        self.assertIn('total_wall_time', timings)